@@ -3,6 +3,8 @@ from dataclasses import dataclass
 import httpx
 from pydantic_ai import Agent, ModelRetry, RunContext
 
+from core.http_clients import http_clients
+
 # model = OpenAIModel(
 #     "model_name",
 #     base_url="https://<openai-compatible-api-endpoint>.com",
@@ -63,8 +65,8 @@ async def validate_result(ctx: RunContext[MyDeps], final_response: str) -> str:
 
 
 async def main():
-    async with httpx.AsyncClient() as client:
-        deps = MyDeps("foobar", client)
+    async with http_clients.lifespan():
+        deps = MyDeps("foobar", http_clients.get())
         result = await agent.run("Tell me a joke.", deps=deps)
         print(result.data)
         # > Did you hear about the tootpaste scandal? They called it Colgage.
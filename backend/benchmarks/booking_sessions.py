@@ -0,0 +1,79 @@
+"""Load test for many concurrent booking sessions on one event loop.
+
+Each session is driven by a `ScriptedIO` that takes `--think-time` seconds to
+answer every question, and books SFO to ANC from the sample listing through
+the local paths (page parser, cheapest-flight solver and seat parser), so no
+model is called and the numbers reflect the booking flow itself:
+
+    python -m benchmarks.booking_sessions --sessions 5000 --think-time 0.05
+
+With a blocking prompt the sessions would run one after another; here the
+total time should stay close to a single session's think time.
+"""
+
+from __future__ import annotations as _annotations
+
+import argparse
+import asyncio
+import datetime
+import json
+import sys
+import time
+
+from pydantic_ai.usage import RunUsage
+
+from benchmarks.common import configure_logfire, percentile
+from flight_booking.booking_io import ScriptedIO
+from flight_booking.flight_booking_agent import (
+    BookingSession,
+    Deps,
+    extract_flights,
+    flights_web_page,
+)
+from flight_booking.seating import SEAT_LETTERS
+
+
+async def run_session(deps: Deps, seat: str, think_time: float) -> tuple[float, bool]:
+    io = ScriptedIO(["yes", seat, seat, seat], delay=think_time)
+    session = BookingSession(deps, io=io)
+    start = time.perf_counter()
+    await session.run()
+    return time.perf_counter() - start, session.stage == "done" and session.seat is not None
+
+
+async def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--think-time", type=float, default=0.05)
+    args = parser.parse_args(argv)
+
+    configure_logfire()
+
+    flights = await extract_flights(flights_web_page, RunUsage())
+    deps = Deps("SFO", "ANC", datetime.date(2025, 1, 10), flights)
+    seats = [f"{row}{letter}" for letter in SEAT_LETTERS for row in range(1, 31)]
+
+    start = time.perf_counter()
+    results = await asyncio.gather(
+        *(
+            run_session(deps, seats[i % len(seats)], args.think_time)
+            for i in range(args.sessions)
+        )
+    )
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for latency, _ in results)
+    report = {
+        "sessions": args.sessions,
+        "booked": sum(booked for _, booked in results),
+        "elapsed_s": round(elapsed, 3),
+        "sessions_per_second": round(args.sessions / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+    }
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
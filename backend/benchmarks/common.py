@@ -0,0 +1,15 @@
+"""Helpers shared by the benchmarks."""
+
+from __future__ import annotations as _annotations
+
+import logfire
+
+
+def configure_logfire() -> None:
+    """Keep logfire from sending or printing spans, which would drown the report."""
+    logfire.configure(send_to_logfire=False, console=False)
+
+
+def percentile(ordered: list[float], q: float) -> float:
+    """The `q` quantile of `ordered`, which must be sorted and non-empty."""
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
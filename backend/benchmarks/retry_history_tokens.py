@@ -0,0 +1,136 @@
+"""Prompt tokens per retry of a search loop, full history vs `CompactRetryHistory`.
+
+The model is a `FunctionModel` that searches once and then rejects every
+result, like `flight_search_agent` when nothing satisfies the validator, and
+the search tool returns `--flights` flights. Each attempt's input tokens are
+reported for every policy, as JSON:
+
+    python -m benchmarks.retry_history_tokens --retries 10 --flights 50
+"""
+
+from __future__ import annotations as _annotations
+
+import argparse
+import asyncio
+import datetime
+import json
+import sys
+
+from pydantic import BaseModel
+from pydantic_ai import Agent
+from pydantic_ai.messages import (
+    ModelMessage,
+    ModelRequest,
+    ModelResponse,
+    ToolCallPart,
+    ToolReturnPart,
+)
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+from pydantic_ai.usage import RunUsage
+
+from benchmarks.common import configure_logfire
+from flight_booking.retry_history import (
+    CompactRetryHistory,
+    RetryHistoryPolicy,
+    full_history,
+)
+
+
+class Flight(BaseModel):
+    flight_number: str
+    price: int
+    origin: str
+    destination: str
+    date: datetime.date
+
+
+class NoFlightFound(BaseModel):
+    """When no valid flight is found."""
+
+
+def rejecting_model() -> FunctionModel:
+    async def respond(messages: list[ModelMessage], info: AgentInfo) -> ModelResponse:
+        last = messages[-1]
+        searched = isinstance(last, ModelRequest) and any(
+            isinstance(part, ToolReturnPart) and part.tool_name == "flight_search"
+            for part in last.parts
+        )
+        if not searched:
+            return ModelResponse(parts=[ToolCallPart("flight_search", {})])
+        no_flight = next(t for t in info.output_tools if "NoFlightFound" in t.name)
+        return ModelResponse(parts=[ToolCallPart(no_flight.name, {})])
+
+    return FunctionModel(respond)
+
+
+def build_agent(flights: int) -> Agent[None, Flight | NoFlightFound]:
+    agent = Agent(
+        rejecting_model(),
+        output_type=Flight | NoFlightFound,  # type: ignore
+        system_prompt="Find the cheapest flight for the user based on extracted flights.",
+    )
+    inventory = [
+        Flight(
+            flight_number=f"AK{i:04d}",
+            price=100 + i,
+            origin="SFO",
+            destination="ANC",
+            date=datetime.date(2025, 1, 10),
+        )
+        for i in range(flights)
+    ]
+
+    @agent.tool_plain
+    async def flight_search() -> list[Flight]:
+        return inventory
+
+    return agent
+
+
+async def input_tokens_per_retry(
+    agent: Agent[None, Flight | NoFlightFound], policy: RetryHistoryPolicy, retries: int
+) -> list[int]:
+    tokens = []
+    usage = RunUsage()
+    message_history: list[ModelMessage] | None = None
+    for attempt in range(retries):
+        before = usage.input_tokens
+        result = await agent.run(
+            f"Find me a flight from SFO to ANC on 2025-01-10 (attempt {attempt + 1})",
+            message_history=message_history,
+            usage=usage,
+        )
+        tokens.append(usage.input_tokens - before)
+        message_history = policy(
+            result.all_messages(output_tool_return_content="Please try again.")
+        )
+    return tokens
+
+
+async def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--retries", type=int, default=10)
+    parser.add_argument("--flights", type=int, default=50)
+    parser.add_argument("--max-tokens", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    configure_logfire()
+
+    agent = build_agent(args.flights)
+    policies: dict[str, RetryHistoryPolicy] = {
+        "full": full_history,
+        "compact": CompactRetryHistory(args.max_tokens),
+    }
+    report = {
+        "args": vars(args),
+        "input_tokens_per_retry": {
+            name: await input_tokens_per_retry(agent, policy, args.retries)
+            for name, policy in policies.items()
+        },
+    }
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,85 @@
+"""Render cost and prefix stability of the `sql_gen` system prompt.
+
+Compares the original layout, which re-rendered the schema and examples on
+every run with today's date in the middle, against the memoized static
+prefix with the date appended. Reports the mean render time and how many
+leading characters the prompts for two different days share, which is what
+provider-side prompt caching can reuse, as JSON:
+
+    python -m benchmarks.sql_gen_system_prompt --renders 10000
+"""
+
+from __future__ import annotations as _annotations
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import timeit
+from datetime import date, timedelta
+
+from pydantic_ai.format_as_xml import format_as_xml
+
+from benchmarks.common import configure_logfire
+from sql_gen.sql_gen import (
+    DB_SCHEMA,
+    SQL_EXAMPLES,
+    render_system_prompt,
+    static_system_prompt,
+)
+
+
+def legacy_system_prompt(today: date) -> str:
+    return f"""\
+Given the following PostgreSQL table of records, your job is to
+write a SQL query that suits the user's request.
+
+Database schema:
+
+{DB_SCHEMA}
+
+today's date = {today}
+
+{format_as_xml(SQL_EXAMPLES)}
+"""
+
+
+def shared_prefix(a: str, b: str) -> int:
+    return len(os.path.commonprefix([a, b]))
+
+
+def measure(render, renders: int) -> dict[str, float | int | str]:
+    today = date.today()
+    tomorrow = today + timedelta(days=1)
+    seconds = timeit.timeit(lambda: render(today), number=renders)
+    prompt = render(today)
+    prefix = shared_prefix(prompt, render(tomorrow))
+    return {
+        "mean_us": round(seconds / renders * 1e6, 3),
+        "length": len(prompt),
+        "stable_prefix": prefix,
+        "stable_fraction": round(prefix / len(prompt), 3),
+        "prefix_sha256": hashlib.sha256(prompt[:prefix].encode()).hexdigest()[:16],
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--renders", type=int, default=10000)
+    args = parser.parse_args(argv)
+
+    configure_logfire()
+
+    static_system_prompt()  # the first render is paid once per process
+    report = {
+        "renders": args.renders,
+        "legacy": measure(legacy_system_prompt, args.renders),
+        "memoized": measure(render_system_prompt, args.renders),
+    }
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,289 @@
+"""Offline latency benchmark for `weather_agent`.
+
+The model is a `FunctionModel` replaying a scripted sequence of tool calls and
+the weather/geocode APIs are served by an `httpx.MockTransport`; both sleep
+for an injectable latency. Each scenario reports p50/p95/p99 for the whole
+run, each model turn, each tool and each upstream, as JSON:
+
+    python -m benchmarks.weather_agent_latency --runs 200 --output before.json
+    python -m benchmarks.weather_agent_latency --runs 200 --compare before.json
+"""
+
+from __future__ import annotations as _annotations
+
+import argparse
+import asyncio
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any
+
+import httpx
+from pydantic_ai import Agent
+from pydantic_ai.messages import (
+    FunctionToolCallEvent,
+    FunctionToolResultEvent,
+    ModelMessage,
+    ModelResponse,
+    TextPart,
+    ToolCallPart,
+)
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+
+from benchmarks.common import configure_logfire, percentile
+from weather_forecast.gazetteer import Gazetteer
+from weather_forecast.geocode_cache import GeocodeCache
+from weather_forecast.weather_agent import Deps, weather_agent
+from weather_forecast.weather_cache import WeatherCache
+
+# each turn is the tool calls the model makes in one response; the final
+# response after the last turn is plain text
+SCENARIOS: dict[str, list[list[tuple[str, dict[str, Any]]]]] = {
+    "one_city": [
+        [("get_lat_lng", {"location_description": "London"})],
+        [("get_weather", {"lat": 51.5, "lng": -0.1})],
+    ],
+    "two_cities_sequential": [
+        [("get_lat_lng", {"location_description": "London"})],
+        [("get_lat_lng", {"location_description": "Wiltshire"})],
+        [("get_weather", {"lat": 51.5, "lng": -0.1})],
+        [("get_weather", {"lat": 51.3, "lng": -1.9})],
+    ],
+    "two_cities_parallel": [
+        [
+            ("get_lat_lng", {"location_description": "London"}),
+            ("get_lat_lng", {"location_description": "Wiltshire"}),
+        ],
+        [
+            ("get_weather", {"lat": 51.5, "lng": -0.1}),
+            ("get_weather", {"lat": 51.3, "lng": -1.9}),
+        ],
+    ],
+    "two_cities_batch": [
+        [("get_lat_lng_batch", {"location_descriptions": ["London", "Wiltshire"]})],
+        [
+            (
+                "get_weather_batch",
+                {"locations": [{"lat": 51.5, "lng": -0.1}, {"lat": 51.3, "lng": -1.9}]},
+            )
+        ],
+    ],
+}
+
+
+@dataclass
+class Latency:
+    """Injected latency: `base` seconds, scaled by a uniform random jitter."""
+
+    base: float
+    jitter: float = 0.5
+
+    def sample(self, rng: random.Random) -> float:
+        return self.base * rng.uniform(1 - self.jitter, 1 + self.jitter)
+
+
+class Recorder:
+    def __init__(self):
+        self.samples: dict[str, list[float]] = defaultdict(list)
+
+    def add(self, name: str, seconds: float) -> None:
+        self.samples[name].append(seconds)
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        return {name: summarize(values) for name, values in sorted(self.samples.items())}
+
+
+def summarize(values: list[float]) -> dict[str, float]:
+    ordered = sorted(values)
+    return {
+        "n": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3),
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(ordered, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 3),
+    }
+
+
+def scripted_model(
+    script: list[list[tuple[str, dict[str, Any]]]], latency: Latency, rng: random.Random
+) -> FunctionModel:
+    async def respond(messages: list[ModelMessage], info: AgentInfo) -> ModelResponse:
+        await asyncio.sleep(latency.sample(rng))
+        turn = sum(isinstance(m, ModelResponse) for m in messages)
+        if turn < len(script):
+            return ModelResponse(
+                parts=[ToolCallPart(name, args) for name, args in script[turn]]
+            )
+        return ModelResponse(parts=[TextPart("It's sunny.")])
+
+    return FunctionModel(respond)
+
+
+def mock_transport(
+    recorder: Recorder, geocode: Latency, weather: Latency, rng: random.Random
+) -> httpx.MockTransport:
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.host == "geocode.maps.co":
+            delay = geocode.sample(rng)
+            body: Any = [{"lat": "51.5", "lon": "-0.1"}]
+        else:
+            delay = weather.sample(rng)
+            body = {"data": {"values": {"temperatureApparent": 21.0, "weatherCode": 1000}}}
+        await asyncio.sleep(delay)
+        recorder.add(request.url.host, delay)
+        return httpx.Response(200, json=body)
+
+    return httpx.MockTransport(handler)
+
+
+async def run_once(deps: Deps, model: FunctionModel, recorder: Recorder) -> None:
+    started: dict[str, tuple[str, float]] = {}
+    start = time.perf_counter()
+    with weather_agent.override(model=model):
+        async with weather_agent.iter("What is the weather like?", deps=deps) as run:
+            node = run.next_node
+            while not Agent.is_end_node(node):
+                node_start = time.perf_counter()
+                if Agent.is_call_tools_node(node):
+                    async with node.stream(run.ctx) as events:
+                        async for event in events:
+                            now = time.perf_counter()
+                            if isinstance(event, FunctionToolCallEvent):
+                                started[event.part.tool_call_id] = (
+                                    event.part.tool_name,
+                                    now,
+                                )
+                            elif isinstance(event, FunctionToolResultEvent):
+                                name, t0 = started.pop(event.tool_call_id)
+                                recorder.add(f"tool:{name}", now - t0)
+                    node = await run.next(node)
+                else:
+                    is_model_turn = Agent.is_model_request_node(node)
+                    node = await run.next(node)
+                    if is_model_turn:
+                        recorder.add("model_turn", time.perf_counter() - node_start)
+    recorder.add("end_to_end", time.perf_counter() - start)
+
+
+async def run_scenario(name: str, args: argparse.Namespace) -> dict[str, Any]:
+    rng = random.Random(args.seed)
+    recorder = Recorder()
+    transport = mock_transport(
+        recorder,
+        Latency(args.geocode_latency, args.jitter),
+        Latency(args.weather_latency, args.jitter),
+        rng,
+    )
+    model = scripted_model(SCENARIOS[name], Latency(args.model_latency, args.jitter), rng)
+    async with httpx.AsyncClient(transport=transport) as client:
+        deps = Deps(client=client, weather_api_key="bench", geo_api_key="bench")
+        if args.with_caches:
+            deps.gazetteer = Gazetteer.from_csv()
+            deps.geocode_cache = GeocodeCache()
+            deps.weather_cache = WeatherCache()
+
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def one() -> None:
+            async with semaphore:
+                await run_once(deps, model, recorder)
+
+        await asyncio.gather(*(one() for _ in range(args.runs)))
+
+    summary = recorder.summary()
+    return {
+        "end_to_end": summary.pop("end_to_end"),
+        "model_turns": summary.pop("model_turn"),
+        "tools": {k.removeprefix("tool:"): v for k, v in summary.items() if k.startswith("tool:")},
+        "upstreams": {k: v for k, v in summary.items() if not k.startswith("tool:")},
+    }
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def flatten(report: dict[str, Any], prefix: str = "") -> dict[str, float]:
+    flat: dict[str, float] = {}
+    for key, value in report.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        elif key.endswith("_ms"):
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def compare(baseline: dict[str, Any], current: dict[str, Any], threshold: float) -> bool:
+    """Print every percentile that moved by more than `threshold`; True if any regressed."""
+    old = flatten(baseline["scenarios"])
+    new = flatten(current["scenarios"])
+    regressed = False
+    for key in sorted(old.keys() & new.keys()):
+        if old[key] == 0:
+            continue
+        change = new[key] / old[key] - 1
+        if abs(change) > threshold:
+            regressed |= change > 0
+            print(f"{key}: {old[key]:.3f}ms -> {new[key]:.3f}ms ({change:+.1%})")
+    return regressed
+
+
+async def run_scenarios(names: list[str], args: argparse.Namespace) -> dict[str, Any]:
+    return {name: await run_scenario(name, args) for name in names}
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenario", choices=SCENARIOS, action="append")
+    parser.add_argument("--runs", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--model-latency", type=float, default=0.05)
+    parser.add_argument("--geocode-latency", type=float, default=0.02)
+    parser.add_argument("--weather-latency", type=float, default=0.03)
+    parser.add_argument("--jitter", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--with-caches", action="store_true")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--compare", help="JSON report to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    configure_logfire()
+
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "args": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        },
+        "scenarios": asyncio.run(run_scenarios(args.scenario or list(SCENARIOS), args)),
+    }
+
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            return int(compare(json.load(f), report, args.threshold))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -19,6 +19,49 @@ class Settings(BaseConfig):
     OPENAI_API_KEY: str | None = None
     WEATHER_API_KEY: str | None = None
     GEO_API_KEY: str | None = None
+    # CSV of well-known places; the bundled weather_forecast/data/gazetteer.csv if unset
+    GAZETTEER_PATH: str | None = None
+    GEOCODE_CACHE_PATH: str | None = ".cache/geocode.sqlite3"
+    GEOCODE_CACHE_SIZE: int = 1024
+    GEOCODE_CACHE_TTL: int = 30 * 24 * 60 * 60
+    # ~5 km grid cells, readings reused for 10 minutes
+    WEATHER_CACHE_GRID: float = 0.05
+    WEATHER_CACHE_BUCKET: int = 600
+    WEATHER_BATCH_CONCURRENCY: int = 4
+    # seconds a single tool call may wait on each upstream, hedges included
+    GEOCODE_LATENCY_BUDGET: float = 3.0
+    WEATHER_LATENCY_BUDGET: float = 3.0
+    UPSTREAM_FAILURE_THRESHOLD: int = 5
+    UPSTREAM_RESET_TIMEOUT: float = 30.0
+    UPSTREAM_HEDGE_QUANTILE: float | None = 0.95
+    # past daily weather served locally, see weather_forecast/historic_store.py
+    HISTORIC_STORE_PATH: str | None = ".cache/historic_weather"
+    # flights extracted from listing pages, keyed by a hash of each flight's text
+    EXTRACTION_CACHE_PATH: str | None = ".cache/extraction.sqlite3"
+    # flight blocks sent to extraction_agent at once
+    EXTRACTION_CONCURRENCY: int = 8
+    # cap on the history resent to an agent after a rejected attempt
+    RETRY_HISTORY_MAX_TOKENS: int = 1000
+    # JSON lines file each booking run appends its per-stage usage report to
+    USAGE_REPORT_PATH: str | None = None
+    SQL_GEN_POOL_MIN_SIZE: int = 1
+    SQL_GEN_POOL_MAX_SIZE: int = 10
+    # the Gradio app sends streamed text at most every interval or max chars
+    UI_STREAM_INTERVAL: float = 0.1
+    UI_STREAM_MAX_CHARS: int = 400
+    UI_MAX_SESSIONS: int = 1000
+    UI_SESSION_MAX_BYTES: int = 64 * 1024 * 1024
+    HTTP_TIMEOUT: float = 10.0
+    HTTP_CONNECT_TIMEOUT: float = 5.0
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_KEEPALIVE_EXPIRY: float = 30.0
+    HTTP_HTTP2: bool = True
+    # per-host connection caps, e.g. PROD_HTTP_HOST_LIMITS='{"https://geocode.maps.co": 10}'
+    HTTP_HOST_LIMITS: dict[str, int] = {
+        "https://geocode.maps.co": 10,
+        "http://api.tomorrow.io": 10,
+    }
 
 
 class DevConfig(Settings):
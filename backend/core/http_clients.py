@@ -0,0 +1,75 @@
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+from httpx import AsyncClient, AsyncHTTPTransport, Limits, Timeout
+
+from core.config import Settings, settings
+
+
+def build_client(config: Settings) -> AsyncClient:
+    """Build an `AsyncClient` with the pool limits, keepalive and timeouts from `config`.
+
+    Every host in `HTTP_HOST_LIMITS` gets its own transport, so one slow
+    upstream can't take every connection in the pool.
+    """
+    keepalive = min(config.HTTP_MAX_KEEPALIVE_CONNECTIONS, config.HTTP_MAX_CONNECTIONS)
+    mounts = {
+        host: AsyncHTTPTransport(
+            http2=config.HTTP_HTTP2,
+            limits=Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=min(keepalive, max_connections),
+                keepalive_expiry=config.HTTP_KEEPALIVE_EXPIRY,
+            ),
+        )
+        for host, max_connections in config.HTTP_HOST_LIMITS.items()
+    }
+    return AsyncClient(
+        http2=config.HTTP_HTTP2,
+        limits=Limits(
+            max_connections=config.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=keepalive,
+            keepalive_expiry=config.HTTP_KEEPALIVE_EXPIRY,
+        ),
+        timeout=Timeout(config.HTTP_TIMEOUT, connect=config.HTTP_CONNECT_TIMEOUT),
+        mounts=mounts,
+    )
+
+
+class ClientRegistry:
+    """Named, process-wide `AsyncClient`s that agents' deps share.
+
+    Clients are created on first use (or by `startup`) and kept warm until
+    `shutdown`, so connections are reused across agent runs.
+    """
+
+    def __init__(self, config: Settings):
+        self.config = config
+        self._clients: dict[str, AsyncClient] = {}
+
+    def get(self, name: str = "default") -> AsyncClient:
+        client = self._clients.get(name)
+        if client is None or client.is_closed:
+            client = self._clients[name] = build_client(self.config)
+        return client
+
+    async def startup(self, *names: str) -> None:
+        for name in names or ("default",):
+            self.get(name)
+
+    async def shutdown(self) -> None:
+        clients, self._clients = self._clients, {}
+        for client in clients.values():
+            await client.aclose()
+
+    @asynccontextmanager
+    async def lifespan(self, *names: str) -> AsyncIterator["ClientRegistry"]:
+        """Start the registry for the duration of the block, e.g. in a FastAPI lifespan."""
+        await self.startup(*names)
+        try:
+            yield self
+        finally:
+            await self.shutdown()
+
+
+http_clients = ClientRegistry(settings)
@@ -0,0 +1,154 @@
+import asyncio
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from typing import TypeVar
+
+T = TypeVar("T")
+
+
+class UpstreamUnavailable(Exception):
+    """An upstream could not answer within its budget."""
+
+    def __init__(self, upstream: str, reason: str):
+        super().__init__(f"{upstream} is unavailable: {reason}")
+        self.upstream = upstream
+
+
+class CircuitOpenError(UpstreamUnavailable):
+    def __init__(self, upstream: str):
+        super().__init__(upstream, "circuit open")
+
+
+class UpstreamTimeout(UpstreamUnavailable):
+    def __init__(self, upstream: str, budget: float):
+        super().__init__(upstream, f"no response within {budget}s")
+
+
+class LatencyTracker:
+    """Rolling window of recent successful call latencies."""
+
+    def __init__(self, window: int = 200):
+        self._samples: deque[float] = deque(maxlen=window)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def observe(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def quantile(self, q: float) -> float | None:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures.
+
+    While open, calls are rejected until `reset_timeout` seconds have passed,
+    then a single trial call is let through; its outcome closes the circuit
+    or keeps it open for another `reset_timeout`.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self._opened_at: float | None = None
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    def allow(self) -> bool:
+        if self._opened_at is None:
+            return True
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            # half-open: this caller is the trial, everyone else keeps failing fast
+            self._opened_at = time.monotonic()
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self._opened_at = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
+
+
+class Upstream:
+    """Latency budget, circuit breaker and tail-latency hedging for one upstream.
+
+    Once `hedge_min_samples` latencies have been seen, a call that hasn't
+    finished after the `hedge_quantile` latency gets a second, identical
+    request; whichever finishes first wins and the other is cancelled.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        budget: float,
+        breaker: CircuitBreaker | None = None,
+        hedge_quantile: float | None = 0.95,
+        hedge_min_samples: int = 20,
+    ):
+        self.name = name
+        self.budget = budget
+        self.breaker = breaker or CircuitBreaker()
+        self.latency = LatencyTracker()
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedges = 0
+
+    def hedge_delay(self) -> float | None:
+        if self.hedge_quantile is None or len(self.latency) < self.hedge_min_samples:
+            return None
+        return self.latency.quantile(self.hedge_quantile)
+
+    async def call(self, request: Callable[[], Awaitable[T]]) -> T:
+        if not self.breaker.allow():
+            raise CircuitOpenError(self.name)
+
+        start = time.perf_counter()
+        try:
+            async with asyncio.timeout(self.budget):
+                result = await self._hedged(request)
+        except TimeoutError as e:
+            self.breaker.record_failure()
+            raise UpstreamTimeout(self.name, self.budget) from e
+        except Exception:
+            self.breaker.record_failure()
+            raise
+
+        self.breaker.record_success()
+        self.latency.observe(time.perf_counter() - start)
+        return result
+
+    async def _hedged(self, request: Callable[[], Awaitable[T]]) -> T:
+        delay = self.hedge_delay()
+        tasks = {asyncio.ensure_future(request())}
+        try:
+            if delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done:
+                    self.hedges += 1
+                    tasks.add(asyncio.ensure_future(request()))
+
+            while True:
+                done, tasks = await asyncio.wait(
+                    tasks, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                if not tasks:
+                    raise done.pop().exception()  # type: ignore[misc]
+        finally:
+            for task in tasks:
+                task.cancel()
@@ -0,0 +1,191 @@
+"""Per-stage usage and wall time for flows that chain several agents.
+
+Every agent run in the flow is given the ledger's one shared `RunUsage` and
+`UsageLimits`, so limits are enforced on the flow as a whole exactly as
+before, and each stage is charged with whatever the shared usage grew by
+while it ran. Stages of one ledger must therefore not run concurrently.
+
+Tools wrapped with `timed_tool` also charge their wall time to the stage
+they're called in.
+"""
+
+from __future__ import annotations as _annotations
+
+import functools
+import inspect
+import json
+import time
+import uuid
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, TypeVar
+
+import logfire
+from pydantic_ai.messages import (
+    ModelMessage,
+    ModelResponse,
+    RetryPromptPart,
+    ToolCallPart,
+)
+from pydantic_ai.usage import RunUsage, UsageLimits
+
+_COUNTERS = ("requests", "input_tokens", "output_tokens", "tool_calls")
+# per-tool tallies, summed key by key when reports are aggregated
+_TOOL_TALLIES = ("tools", "tool_time")
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+@dataclass
+class StageUsage:
+    agent: str | None = None
+    runs: int = 0
+    requests: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    tool_calls: int = 0
+    # model answers sent back for another try, by a validator or tool
+    retries: int = 0
+    wall_time: float = 0.0
+    # calls per function tool
+    tools: dict[str, int] = field(default_factory=dict)
+    # wall time per function tool wrapped with `timed_tool`
+    tool_time: dict[str, float] = field(default_factory=dict)
+
+    def record_messages(self, messages: list[ModelMessage]) -> None:
+        """Count tool calls and retries in the messages of one agent run."""
+        self.runs += 1
+        for message in messages:
+            for part in message.parts:
+                if isinstance(part, RetryPromptPart):
+                    self.retries += 1
+                elif (
+                    isinstance(message, ModelResponse)
+                    and isinstance(part, ToolCallPart)
+                    and not part.tool_name.startswith("final_result")
+                ):
+                    self.tools[part.tool_name] = self.tools.get(part.tool_name, 0) + 1
+
+    def add_tool_time(self, tool_name: str, seconds: float) -> None:
+        self.tool_time[tool_name] = self.tool_time.get(tool_name, 0.0) + seconds
+
+
+# the stage the current task is in, for `timed_tool`
+_current_stage: ContextVar[StageUsage | None] = ContextVar(
+    "current_stage", default=None
+)
+
+
+def timed_tool(func: F) -> F:
+    """Charge the wall time of every call of the tool `func` to the current stage.
+
+    Apply it under the agent's tool decorator. Calls outside a stage aren't timed.
+    """
+    name = func.__name__
+
+    def charge(start: float) -> None:
+        if (stage := _current_stage.get()) is not None:
+            stage.add_tool_time(name, time.perf_counter() - start)
+
+    if inspect.iscoroutinefunction(func):
+
+        @functools.wraps(func)
+        async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                charge(start)
+
+        return async_wrapper  # type: ignore[return-value]
+
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            charge(start)
+
+    return wrapper  # type: ignore[return-value]
+
+
+class UsageLedger:
+    def __init__(self, usage: RunUsage | None = None, limits: UsageLimits | None = None):
+        self.usage = usage or RunUsage()
+        self.limits = limits
+        self.run_id = uuid.uuid4().hex
+        self.started_at = time.time()
+        self.stages: dict[str, StageUsage] = {}
+
+    @contextmanager
+    def stage(self, name: str, agent: str | None = None) -> Iterator[StageUsage]:
+        """Charge everything the shared usage grows by inside the block to `name`."""
+        stage = self.stages.setdefault(name, StageUsage(agent=agent))
+        before = [getattr(self.usage, counter) for counter in _COUNTERS]
+        start = time.perf_counter()
+        token = _current_stage.set(stage)
+        with logfire.span("stage {stage}", stage=name, agent=agent):
+            try:
+                yield stage
+            finally:
+                _current_stage.reset(token)
+                stage.wall_time += time.perf_counter() - start
+                for counter, value in zip(_COUNTERS, before):
+                    setattr(
+                        stage,
+                        counter,
+                        getattr(stage, counter) + getattr(self.usage, counter) - value,
+                    )
+
+    def report(self) -> dict[str, Any]:
+        return {
+            "run_id": self.run_id,
+            "started_at": self.started_at,
+            "wall_time": round(time.time() - self.started_at, 3),
+            "total": {counter: getattr(self.usage, counter) for counter in _COUNTERS},
+            "stages": {
+                name: {
+                    **asdict(stage),
+                    "wall_time": round(stage.wall_time, 3),
+                    "tool_time": {
+                        tool: round(seconds, 3) for tool, seconds in stage.tool_time.items()
+                    },
+                }
+                for name, stage in self.stages.items()
+            },
+        }
+
+    def dump(self, path: str | Path) -> None:
+        """Append this run's report to a JSON lines file."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("a") as f:
+            f.write(json.dumps(self.report()) + "\n")
+
+
+def aggregate(reports: Iterable[dict[str, Any]]) -> dict[str, Any]:
+    """Sum per-stage reports from many runs, e.g. every line of a `dump` file."""
+    runs = 0
+    stages: dict[str, dict[str, Any]] = {}
+    for report in reports:
+        runs += 1
+        for name, stage in report["stages"].items():
+            total = stages.setdefault(
+                name, {"agent": stage["agent"], **{key: {} for key in _TOOL_TALLIES}}
+            )
+            for key, value in stage.items():
+                if key in _TOOL_TALLIES:
+                    for tool, amount in value.items():
+                        total[key][tool] = total[key].get(tool, 0) + amount
+                elif key != "agent":
+                    total[key] = total.get(key, 0) + value
+    for total in stages.values():
+        total["wall_time"] = round(total.get("wall_time", 0), 3)
+        total["tool_time"] = {
+            tool: round(seconds, 3) for tool, seconds in total["tool_time"].items()
+        }
+    return {"runs": runs, "stages": stages}
@@ -1,8 +1,11 @@
+import asyncio
 from dataclasses import dataclass
 
 import httpx
 from pydantic_ai import Agent, ModelRetry, RunContext
 
+from core.http_clients import http_clients
+
 # model = OpenAIModel(
 #     "model_name",
 #     base_url="https://<openai-compatible-api-endpoint>.com",
@@ -67,7 +70,17 @@ async def validate_result(ctx: RunContext[MyDeps], final_response: str) -> str:
 
 async def application_code(prompt: str) -> str:
     # now deep within application code we call our agent
-    async with httpx.AsyncClient() as client:
-        app_deps = MyDeps("foobar", client)
-        result = await joke_agent.run(prompt, deps=app_deps)
+    # the shared client stays open between calls so connections are reused
+    app_deps = MyDeps("foobar", http_clients.get())
+    result = await joke_agent.run(prompt, deps=app_deps)
     return result.data
+
+
+async def main():
+    # close the shared clients before the event loop goes away
+    async with http_clients.lifespan():
+        print(await application_code("Tell me a joke."))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,82 @@
+"""Where a booking conversation gets its answers and sends its messages.
+
+The booking flow only awaits `ask` and calls `say`, so many conversations can
+share one event loop whether they're driven by a terminal, a queue fed from
+a websocket, or a script in a load test.
+"""
+
+from __future__ import annotations as _annotations
+
+import asyncio
+from collections.abc import Iterable
+from typing import Protocol
+
+from rich.prompt import Prompt
+
+
+class BookingIO(Protocol):
+    async def ask(self, prompt: str, choices: list[str] | None = None) -> str: ...
+
+    def say(self, message: str) -> None: ...
+
+
+class ConsoleIO:
+    """Prompts on the terminal, in a worker thread so the event loop keeps running."""
+
+    async def ask(self, prompt: str, choices: list[str] | None = None) -> str:
+        return await asyncio.to_thread(
+            Prompt.ask, prompt, choices=choices, show_choices=False
+        )
+
+    def say(self, message: str) -> None:
+        print(message)
+
+
+class ScriptedIO:
+    """Answers from a fixed script, recording everything said, for tests and load runs."""
+
+    def __init__(self, answers: Iterable[str], delay: float = 0.0):
+        self._answers = iter(answers)
+        # simulated time for the user to answer
+        self.delay = delay
+        self.transcript: list[str] = []
+
+    async def ask(self, prompt: str, choices: list[str] | None = None) -> str:
+        self.transcript.append(prompt)
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        try:
+            answer = next(self._answers)
+        except StopIteration:
+            raise EOFError(f"script has no answer for {prompt!r}") from None
+        self.transcript.append(answer)
+        return answer
+
+    def say(self, message: str) -> None:
+        self.transcript.append(message)
+
+
+class QueueIO:
+    """Answers fed through a queue, with prompts and messages sent to another.
+
+    A websocket handler forwards `outbox` to the client and calls `answer`
+    with whatever comes back.
+    """
+
+    def __init__(self):
+        self.inbox: asyncio.Queue[str] = asyncio.Queue()
+        self.outbox: asyncio.Queue[str] = asyncio.Queue()
+
+    async def ask(self, prompt: str, choices: list[str] | None = None) -> str:
+        await self.outbox.put(prompt)
+        while True:
+            answer = await self.inbox.get()
+            if choices is None or answer in choices:
+                return answer
+            await self.outbox.put(f"Please answer one of: {', '.join(choices)}")
+
+    def say(self, message: str) -> None:
+        self.outbox.put_nowait(message)
+
+    async def answer(self, text: str) -> None:
+        await self.inbox.put(text)
@@ -0,0 +1,175 @@
+from __future__ import annotations as _annotations
+
+import asyncio
+import hashlib
+import json
+import re
+import sqlite3
+from collections.abc import Awaitable, Callable, Hashable
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Generic, TypeVar
+
+import logfire
+from pydantic import TypeAdapter
+
+T = TypeVar("T")
+
+# a listing entry starts with its position, e.g. "3. Flight SFO-AK789"
+_BLOCK_START = re.compile(r"^\s*\d+\.\s+", re.MULTILINE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def split_flight_blocks(page: str) -> list[str]:
+    """Split a listing page into one block of text per flight.
+
+    Text before the first entry, like a page heading, isn't a flight and is
+    left out. A page that doesn't look like a numbered listing is a single
+    block.
+    """
+    starts = [m.start() for m in _BLOCK_START.finditer(page)]
+    if not starts:
+        return [page.strip()] if page.strip() else []
+    bounds = zip(starts, [*starts[1:], len(page)])
+    return [block for a, b in bounds if (block := page[a:b].strip())]
+
+
+def schema_version(adapter: TypeAdapter) -> str:
+    """Short hash of the JSON schema `adapter` validates against.
+
+    It changes whenever the model does, so results cached for an older
+    version of the model are never loaded as the new one.
+    """
+    schema = json.dumps(adapter.json_schema(), sort_keys=True)
+    return hashlib.sha256(schema.encode()).hexdigest()[:12]
+
+
+def content_key(text: str) -> str:
+    """Hash of `text` ignoring whitespace and a leading list position.
+
+    Reordering a listing or reflowing its whitespace keeps every block's key.
+    """
+    text = _BLOCK_START.sub("", text, count=1)
+    text = _WHITESPACE.sub(" ", text).strip()
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+@dataclass
+class ExtractionStats:
+    # whole pages served from the cache, without splitting them into blocks
+    cached_pages: int = 0
+    cached_blocks: int = 0
+    # blocks handled by the local parser vs sent to the extractor
+    parsed_blocks: int = 0
+    extracted_blocks: int = 0
+    # items dropped because an earlier block already had the same key
+    duplicates: int = 0
+
+    def as_dict(self) -> dict[str, int]:
+        return asdict(self)
+
+
+class ExtractionCache(Generic[T]):
+    """Validated extraction results keyed by the hash of the text they came from.
+
+    Results are stored as JSON through `adapter`, in SQLite at `path` so they
+    survive restarts, or in memory when no path is given. Keys are prefixed
+    with the `schema_version` of `adapter`, so changing the model starts
+    from an empty cache rather than failing to validate old results.
+    """
+
+    def __init__(self, adapter: TypeAdapter[list[T]], path: str | Path | None = None):
+        self.adapter = adapter
+        self.version = schema_version(adapter)
+        if path is not None:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(
+            ":memory:" if path is None else path,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS extraction (key TEXT PRIMARY KEY, result TEXT NOT NULL)"
+        )
+
+    def get(self, key: str) -> list[T] | None:
+        row = self._db.execute(
+            "SELECT result FROM extraction WHERE key = ?", (f"{self.version}:{key}",)
+        ).fetchone()
+        return None if row is None else self.adapter.validate_json(row[0])
+
+    def set(self, key: str, items: list[T]) -> None:
+        self._db.execute(
+            "INSERT OR REPLACE INTO extraction (key, result) VALUES (?, ?)",
+            (f"{self.version}:{key}", self.adapter.dump_json(items).decode()),
+        )
+
+    def close(self) -> None:
+        self._db.close()
+
+
+async def extract_cached(
+    page: str,
+    extract: Callable[[str], Awaitable[list[T]]],
+    cache: ExtractionCache[T],
+    *,
+    concurrency: int = 8,
+    key: Callable[[T], Hashable] | None = None,
+    parse: Callable[[str], list[T] | None] | None = None,
+    stats: ExtractionStats | None = None,
+) -> list[T]:
+    """Extract items from `page`, only running `extract` on blocks not seen before.
+
+    An unchanged page is a single lookup; when it changes, the blocks whose
+    content is already cached are reused and the new ones are extracted one
+    block per call, at most `concurrency` at a time. Items are returned in
+    page order, keeping only the first item for each `key`.
+
+    Blocks that `parse` can handle locally never reach `extract`; it should
+    return None for anything it isn't sure about. What happened to each block
+    in this call is counted in `stats`, if one is passed.
+    """
+    stats = stats if stats is not None else ExtractionStats()
+    page_key = content_key(page)
+    if (items := cache.get(page_key)) is not None:
+        stats.cached_pages += 1
+        return items
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def extract_block(block: str) -> list[T]:
+        block_key = content_key(block)
+        if (block_items := cache.get(block_key)) is not None:
+            stats.cached_blocks += 1
+            return block_items
+        if parse is not None and (block_items := parse(block)) is not None:
+            stats.parsed_blocks += 1
+        else:
+            async with semaphore:
+                block_items = await extract(block)
+            stats.extracted_blocks += 1
+        cache.set(block_key, block_items)
+        return block_items
+
+    with logfire.span("extract page", concurrency=concurrency) as span:
+        blocks = split_flight_blocks(page)
+        results = await asyncio.gather(*(extract_block(block) for block in blocks))
+        items = []
+        seen: set[Hashable] = set()
+        for block_items in results:
+            for item in block_items:
+                if key is not None:
+                    if (item_key := key(item)) in seen:
+                        stats.duplicates += 1
+                        continue
+                    seen.add(item_key)
+                items.append(item)
+        cache.set(page_key, items)
+        span.set_attribute("stats", stats.as_dict())
+        logfire.info(
+            "{parsed} flight blocks parsed locally, {extracted} sent to the model",
+            parsed=stats.parsed_blocks,
+            extracted=stats.extracted_blocks,
+        )
+    return items
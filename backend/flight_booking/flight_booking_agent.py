@@ -1,12 +1,21 @@
 import datetime
-from dataclasses import dataclass
+import re
+from collections import defaultdict
+from dataclasses import dataclass, field
+from functools import lru_cache
 from typing import Literal
-from rich.prompt import Prompt
 
 import logfire
 from core.config import settings
+from core.usage_ledger import StageUsage, UsageLedger, timed_tool
+from flight_booking.booking_io import BookingIO, ConsoleIO
+from flight_booking.extraction import ExtractionCache, ExtractionStats, extract_cached
+from flight_booking.flight_index import FlightIndex
+from flight_booking.flight_parser import parse_flight_block
+from flight_booking.retry_history import CompactRetryHistory, RetryHistoryPolicy
+from flight_booking.seating import SeatMap, parse_seat
 from pydantic_ai import Agent, ModelRetry, RunContext
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError
 from pydantic_ai.messages import ModelMessage
 from pydantic_ai.models.openai import OpenAIModel
 from pydantic_ai.usage import RunUsage, UsageLimits
@@ -38,12 +47,28 @@ class NoFlightFound(BaseModel):
     """When no valid flight is found."""
 
 
+AIRPORT_CODE = re.compile(r"^[A-Z]{3}$")
+
+
 @dataclass
 class Deps:
     req_origin: str
     req_destination: str
     req_date: datetime.date
     available_flights: list[FlightDetails]
+    flight_index: FlightIndex = field(init=False)
+
+    def __post_init__(self):
+        self.flight_index = FlightIndex(self.available_flights)
+
+    @property
+    def is_structured(self) -> bool:
+        """Whether the request is exact enough to be solved without the model."""
+        return (
+            bool(AIRPORT_CODE.match(self.req_origin))
+            and bool(AIRPORT_CODE.match(self.req_destination))
+            and isinstance(self.req_date, datetime.date)
+        )
 
 
 # **1. Flight Extraction Agent**
@@ -53,20 +78,91 @@ extraction_agent = Agent(
     system_prompt="Extract all the flight details from the given text.",
 )
 
+
+@lru_cache
+def extraction_cache() -> ExtractionCache[FlightDetails]:
+    """The cache of extracted flights, opened on first use rather than on import."""
+    return ExtractionCache(
+        TypeAdapter(list[FlightDetails]), settings.EXTRACTION_CACHE_PATH
+    )
+
+
+async def extract_flights(
+    page: str, usage: RunUsage, stage: StageUsage | None = None
+) -> list[FlightDetails]:
+    """Extract the flights on `page`, reusing cached results for unchanged flights.
+
+    Well-formed listings are parsed locally; the rest are extracted by the
+    model concurrently, all counted against `usage`, with each run's messages
+    recorded on `stage`.
+    """
+
+    def parse(text: str) -> list[FlightDetails] | None:
+        fields = parse_flight_block(text)
+        if fields is None:
+            return None
+        try:
+            return [FlightDetails(**fields)]
+        except ValidationError:
+            return None
+
+    async def extract(text: str) -> list[FlightDetails]:
+        result = await extraction_agent.run(text, usage=usage)
+        if stage is not None:
+            stage.record_messages(result.new_messages())
+        return result.output
+
+    stats = ExtractionStats()
+    with logfire.span("extract flights") as span:
+        flights = await extract_cached(
+            page,
+            extract,
+            extraction_cache(),
+            concurrency=settings.EXTRACTION_CONCURRENCY,
+            key=lambda flight: flight.flight_number,
+            parse=parse,
+            stats=stats,
+        )
+        # counted on cache hits too, which skip extract_cached's own span
+        span.set_attribute("stats", stats.as_dict())
+    return flights
+
+
 # **2. Flight Search Agent**
 flight_search_agent = Agent[Deps, FlightDetails | NoFlightFound](
     model,
     result_type=FlightDetails | NoFlightFound,  # type: ignore
     retries=2,
-    system_prompt="Find the cheapest flight for the user based on extracted flights.",
+    system_prompt=(
+        "Find the cheapest flight for the user based on extracted flights. "
+        "Use the `flight_search` tool with the user's origin, destination and date."
+    ),
 )
 
 
 @flight_search_agent.tool
-async def flight_search(ctx: RunContext[Deps]) -> list[FlightDetails]:
-    """Retrieve flights already extracted instead of re-calling LLM."""
-    # We pass the usage to the search agent to requests within this agent are counted
-    return ctx.deps.available_flights
+@timed_tool
+async def flight_search(
+    ctx: RunContext[Deps],
+    origin: str,
+    destination: str,
+    date: datetime.date,
+    max_price: int | None = None,
+    limit: int = 5,
+) -> list[FlightDetails]:
+    """Search the flights already extracted, cheapest first.
+
+    Args:
+        ctx: The context.
+        origin: Three-letter code of the departure airport.
+        destination: Three-letter code of the arrival airport.
+        date: Date of the flight.
+        max_price: Only return flights at or below this price.
+        limit: Maximum number of flights to return.
+    """
+    return ctx.deps.flight_index.search(
+        origin, destination, date, max_price=max_price, limit=max(1, min(limit, 20))
+    )
 
 
 @flight_search_agent.result_validator
@@ -109,6 +205,10 @@ seat_preference_agent = Agent[None, SeatPreference | Failed](
 )
 
 
+# taken seats per flight number
+seat_maps: defaultdict[str, SeatMap] = defaultdict(SeatMap)
+
+
 # **4. Booking Logic**
 # in reality this would be downloaded from a booking site,
 # potentially using another agent to navigate the site
@@ -165,74 +265,196 @@ flights_web_page = """
 # restrict how many requests this app can make to the LLM
 usage_limits = UsageLimits(request_limit=15)
 
+console = ConsoleIO()
+
+
+def solve_cheapest(deps: Deps) -> FlightDetails | None:
+    """Cheapest flight matching a structured request, picked in code.
+
+    Returns None when the request isn't structured or nothing matches, in
+    which case the search agent handles the user's free-text request.
+    """
+    if not deps.is_structured:
+        return None
+    return deps.flight_index.cheapest(deps.req_origin, deps.req_destination, deps.req_date)
+
+
+async def find_flight(
+    deps: Deps,
+    ledger: UsageLedger,
+    io: BookingIO = console,
+    *,
+    use_solver: bool = True,
+    history_policy: RetryHistoryPolicy | None = None,
+) -> FlightDetails | None:
+    """Handles flight search and validation logic.
+
+    After a rejected attempt the next one gets the history from
+    `history_policy`, by default a `CompactRetryHistory` capped at
+    `RETRY_HISTORY_MAX_TOKENS`.
+    """
+    if use_solver:
+        with ledger.stage("flight_search_solver"):
+            flight = solve_cheapest(deps)
+        if flight is not None:
+            logfire.info(
+                "picked cheapest flight {flight_number} without the model",
+                flight_number=flight.flight_number,
+            )
+            return flight
 
-async def find_flight(deps: Deps, usage: RunUsage) -> FlightDetails | None:
-    """Handles flight search and validation logic."""
+    history_policy = history_policy or CompactRetryHistory(
+        settings.RETRY_HISTORY_MAX_TOKENS
+    )
     message_history: list[ModelMessage] | None = None
     
     for _ in range(3):
-        prompt = Prompt.ask(
+        prompt = await io.ask(
             f"Find me a flight from {deps.req_origin} to {deps.req_destination} on {deps.req_date}",
         )
-        result = await flight_search_agent.run(
-            prompt,
-            deps=deps,
-            usage=usage,
-            message_history=message_history,
-            usage_limits=usage_limits,
-        )
+        with ledger.stage("flight_search", agent="flight_search_agent") as stage:
+            result = await flight_search_agent.run(
+                prompt,
+                deps=deps,
+                usage=ledger.usage,
+                message_history=message_history,
+                usage_limits=ledger.limits,
+            )
+            stage.record_messages(result.new_messages())
 
         if isinstance(result.output, FlightDetails):
             return result.output
         else: 
-            message_history = result.all_messages(
-                output_tool_return_content='Please try again.'
+            message_history = history_policy(
+                result.all_messages(output_tool_return_content='Please try again.')
             )
 
 
-async def find_seat(usage: RunUsage) -> SeatPreference:
-    """Handles seat selection with limited retries."""
+async def find_seat(
+    ledger: UsageLedger,
+    seat_map: SeatMap | None = None,
+    io: BookingIO = console,
+    *,
+    history_policy: RetryHistoryPolicy | None = None,
+) -> SeatPreference | None:
+    """Handles seat selection with limited retries.
+
+    Answers like "12A" are parsed locally; anything else goes to the seat
+    preference agent. The chosen seat is reserved on `seat_map`, and after
+    too many tries the nearest free seat is assigned. Returns None if the
+    flight is full.
+    """
+    history_policy = history_policy or CompactRetryHistory(
+        settings.RETRY_HISTORY_MAX_TOKENS
+    )
+    seat_map = seat_map if seat_map is not None else SeatMap()
     max_attempts = 3
     attempts = 0
     message_history: list[ModelMessage] | None = None
 
-    while attempts < max_attempts:
-        answer = Prompt.ask("What seat would you like? (e.g., 12A)")
-
-        result = await seat_preference_agent.run(
-            answer,
-            message_history=message_history,
-            usage=usage,
-            usage_limits=usage_limits,
-        )
+    while attempts < max_attempts and seat_map.free_count():
+        answer = await io.ask("What seat would you like? (e.g., 12A)")
 
-        if isinstance(result.output, SeatPreference):
-            return result.output
+        if parsed := parse_seat(answer):
+            seat = SeatPreference(row=parsed[0], seat=parsed[1])
         else:
-            print("Invalid seat selection. Try again.")
-            message_history = result.all_messages()
-            attempts += 1
+            with ledger.stage("seat_preference", agent="seat_preference_agent") as stage:
+                result = await seat_preference_agent.run(
+                    answer,
+                    message_history=message_history,
+                    usage=ledger.usage,
+                    usage_limits=ledger.limits,
+                )
+                stage.record_messages(result.new_messages())
+            if not isinstance(result.output, SeatPreference):
+                io.say("Invalid seat selection. Try again.")
+                message_history = history_policy(result.all_messages())
+                attempts += 1
+                continue
+            seat = result.output
+
+        if seat_map.reserve(seat.row, seat.seat):
+            return seat
+        if window := seat_map.nearest_free_window(seat.row):
+            io.say(
+                f"Seat {seat.row}{seat.seat} is taken. "
+                f"The nearest free window seat is {window[0]}{window[1]}."
+            )
+        elif nearest := seat_map.nearest_free(seat.row):
+            io.say(
+                f"Seat {seat.row}{seat.seat} is taken. There are no window seats left, "
+                f"the nearest free seat is {nearest[0]}{nearest[1]}."
+            )
+        attempts += 1
 
-    print("Max retries reached. Assigning default seat 10C.")
-    return SeatPreference(row=10, seat="C")
+    if assigned := seat_map.reserve_nearest(10):
+        io.say(f"Max retries reached. Assigning seat {assigned[0]}{assigned[1]}.")
+        return SeatPreference(row=assigned[0], seat=assigned[1])
+    io.say("Sorry, this flight is full.")
+    return None
 
 
-async def buy_tickets(flight_details: FlightDetails, seat: SeatPreference):
+async def buy_tickets(
+    flight_details: FlightDetails, seat: SeatPreference, io: BookingIO = console
+):
     """Mock function to simulate purchasing a flight."""
-    print(
+    io.say(
         f"Purchasing flight {flight_details.flight_number} with seat {seat.row}{seat.seat}..."
     )
 
 
+@dataclass
+class BookingSession:
+    """One booking conversation, resumable from the step it was at.
+
+    Every question is awaited on `io`, so thousands of sessions can wait on
+    their users in one event loop. If `run` is cancelled, e.g. because the
+    client disconnected, calling it again picks up at the same question.
+    """
+
+    deps: Deps
+    io: BookingIO
+    ledger: UsageLedger = field(
+        default_factory=lambda: UsageLedger(limits=usage_limits)
+    )
+    stage: Literal["search", "confirm", "seat", "done"] = "search"
+    flight: FlightDetails | None = None
+    seat: SeatPreference | None = None
+
+    async def run(self) -> None:
+        if self.stage == "search":
+            self.flight = await find_flight(self.deps, self.ledger, self.io)
+            if self.flight is None:
+                self.stage = "done"  # No flight found, exit
+                return
+            self.io.say(f"Flight found: {self.flight}")
+            self.stage = "confirm"
+
+        if self.stage == "confirm":
+            action = await self.io.ask(
+                "Do you want to buy this flight? (yes/no)", choices=["yes", "no"]
+            )
+            self.stage = "seat" if action == "yes" else "done"
+
+        if self.stage == "seat":
+            assert self.flight is not None
+            self.seat = await find_seat(
+                self.ledger, seat_maps[self.flight.flight_number], self.io
+            )
+            self.stage = "done"
+            if self.seat is not None:
+                await buy_tickets(self.flight, self.seat, self.io)
+
+
 async def main():
     """Main flow for flight booking."""
 
-    usage = RunUsage()
+    ledger = UsageLedger(limits=usage_limits)
 
     # **Extract flights only once**
-    result = await extraction_agent.run(flights_web_page, usage=usage)
-    logfire.info("found {flight_count} flights", flight_count=len(result.data))
-    available_flights = result.output
+    with ledger.stage("extraction", agent="extraction_agent") as stage:
+        available_flights = await extract_flights(flights_web_page, ledger.usage, stage)
+    logfire.info("found {flight_count} flights", flight_count=len(available_flights))
 
     if not available_flights:
         print("No flights available.")
@@ -245,23 +467,13 @@ async def main():
         available_flights=available_flights,
     )
 
-    # **Find the best flight**
-    flight = await find_flight(deps, usage)
-
-    if not flight:
-        return  # No flight found, exit
-
-    print(f"Flight found: {flight}")
-
-    action = Prompt.ask(
-        "Do you want to buy this flight? (yes/no)",
-        choices=["yes", "no"],
-        show_choices=False,
-    )
-
-    if action == "yes":
-        seat = await find_seat(usage)
-        await buy_tickets(flight, seat)
+    # **Find the best flight, then book a seat on it**
+    session = BookingSession(deps, io=console, ledger=ledger)
+    try:
+        await session.run()
+    finally:
+        if settings.USAGE_REPORT_PATH:
+            ledger.dump(settings.USAGE_REPORT_PATH)
 
 
 if __name__ == "__main__":
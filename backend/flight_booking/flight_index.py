@@ -0,0 +1,66 @@
+from __future__ import annotations as _annotations
+
+import datetime
+from bisect import bisect_right
+from collections.abc import Iterable
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from flight_booking.flight_booking_agent import FlightDetails
+
+RouteKey = tuple[str, str, datetime.date]
+
+
+class FlightIndex:
+    """Flights grouped by (origin, destination, date), each group sorted by price.
+
+    Finding a route is a dict lookup and a price cap is a binary search, so
+    searches stay cheap however many flights are loaded, and only the top
+    matches are ever handed to the model.
+    """
+
+    def __init__(self, flights: Iterable[FlightDetails] = ()):
+        self._prices: dict[RouteKey, list[int]] = {}
+        self._flights: dict[RouteKey, list[FlightDetails]] = {}
+        self._count = 0
+        for flight in flights:
+            self.add(flight)
+
+    def __len__(self) -> int:
+        return self._count
+
+    @staticmethod
+    def _key(origin: str, destination: str, date: datetime.date) -> RouteKey:
+        return origin.upper(), destination.upper(), date
+
+    def add(self, flight: FlightDetails) -> None:
+        key = self._key(flight.origin, flight.destination, flight.date)
+        prices = self._prices.setdefault(key, [])
+        flights = self._flights.setdefault(key, [])
+        i = bisect_right(prices, flight.price)
+        prices.insert(i, flight.price)
+        flights.insert(i, flight)
+        self._count += 1
+
+    def search(
+        self,
+        origin: str,
+        destination: str,
+        date: datetime.date,
+        *,
+        max_price: int | None = None,
+        limit: int = 5,
+    ) -> list[FlightDetails]:
+        """The `limit` cheapest flights on the route, optionally capped at `max_price`."""
+        key = self._key(origin, destination, date)
+        flights = self._flights.get(key, [])
+        end = len(flights)
+        if max_price is not None:
+            end = bisect_right(self._prices[key], max_price) if flights else 0
+        return flights[: min(end, limit)]
+
+    def cheapest(
+        self, origin: str, destination: str, date: datetime.date
+    ) -> FlightDetails | None:
+        flights = self.search(origin, destination, date, limit=1)
+        return flights[0] if flights else None
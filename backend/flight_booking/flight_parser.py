@@ -0,0 +1,68 @@
+from __future__ import annotations as _annotations
+
+import datetime
+import re
+from typing import Any
+
+_FLIGHT = re.compile(
+    r"^\s*(?:\d+\.\s+)?Flight\s+([A-Z0-9]+(?:-[A-Z0-9]+)*)\s*$", re.MULTILINE
+)
+_PRICE = re.compile(r"^\s*-\s*Price:\s*\$\s*(\d[\d,]*)(?:\.00)?\s*$", re.MULTILINE)
+_ORIGIN = re.compile(r"^\s*-\s*Origin:.*\(([A-Z]{3})\)\s*$", re.MULTILINE)
+_DESTINATION = re.compile(r"^\s*-\s*Destination:.*\(([A-Z]{3})\)\s*$", re.MULTILINE)
+_DATE = re.compile(r"^\s*-\s*Date:\s*(.+?)\s*$", re.MULTILINE)
+
+_DATE_FORMATS = ("%B %d, %Y", "%b %d, %Y", "%Y-%m-%d", "%d %B %Y")
+
+
+def _parse_date(text: str) -> datetime.date | None:
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def _only(pattern: re.Pattern[str], block: str) -> str | None:
+    matches = pattern.findall(block)
+    return matches[0] if len(matches) == 1 else None
+
+
+def parse_flight_block(block: str) -> dict[str, Any] | None:
+    """Parse a well-formed listing entry into flight fields.
+
+    Handles entries like
+
+        1. Flight SFO-AK123
+        - Price: $350
+        - Origin: San Francisco International Airport (SFO)
+        - Destination: Ted Stevens Anchorage International Airport (ANC)
+        - Date: January 10, 2025
+
+    Returns None unless every field appears exactly once in a recognized
+    format, so anything unusual is left to the extraction agent.
+    """
+    flight_number = _only(_FLIGHT, block)
+    price = _only(_PRICE, block)
+    origin = _only(_ORIGIN, block)
+    destination = _only(_DESTINATION, block)
+    date_text = _only(_DATE, block)
+    if (
+        flight_number is None
+        or price is None
+        or origin is None
+        or destination is None
+        or date_text is None
+    ):
+        return None
+    date = _parse_date(date_text)
+    if date is None:
+        return None
+    return {
+        "flight_number": flight_number,
+        "price": int(price.replace(",", "")),
+        "origin": origin,
+        "destination": destination,
+        "date": date,
+    }
@@ -0,0 +1,112 @@
+from __future__ import annotations as _annotations
+
+from collections.abc import Callable
+
+from pydantic_ai.messages import (
+    ModelMessage,
+    ModelRequest,
+    ModelResponse,
+    SystemPromptPart,
+    TextPart,
+    ToolCallPart,
+    ToolReturnPart,
+    UserPromptPart,
+)
+
+# turns the messages of a failed attempt into the history for the next one
+RetryHistoryPolicy = Callable[[list[ModelMessage]], list[ModelMessage]]
+
+_NOTE_HEADER = "Earlier attempts that were rejected:"
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count, about four characters per token."""
+    return (len(text) + 3) // 4
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    max_chars = max(max_tokens, 0) * 4
+    return text if len(text) <= max_chars else text[: max(max_chars - 3, 0)] + "..."
+
+
+def full_history(messages: list[ModelMessage]) -> list[ModelMessage]:
+    """Resend everything, growing with every attempt."""
+    return messages
+
+
+class CompactRetryHistory:
+    """Retry history that stays the same size however many attempts fail.
+
+    The next attempt sees the system prompt, one line per rejected attempt
+    (its prompt and answer, newest `max_attempts` only) and the latest
+    function tool result, all in a single request whose size is capped at
+    `max_tokens`. Older attempts go first, then the tool result is cut short.
+
+    Keep one instance per retry loop: it remembers the attempts it has seen.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = 1000,
+        *,
+        max_attempts: int = 5,
+        output_tool_prefix: str = "final_result",
+    ):
+        self.max_tokens = max_tokens
+        self.max_attempts = max_attempts
+        self.output_tool_prefix = output_tool_prefix
+        self.attempts: list[str] = []
+
+    def __call__(self, messages: list[ModelMessage]) -> list[ModelMessage]:
+        system_parts = [
+            part
+            for message in messages[:1]
+            if isinstance(message, ModelRequest)
+            for part in message.parts
+            if isinstance(part, SystemPromptPart)
+        ]
+        prompt, answer, tool_result = self._latest_attempt(messages)
+        self.attempts.append(f"- asked {prompt!r}, answered {answer}")
+        del self.attempts[: -self.max_attempts]
+
+        budget = self.max_tokens - sum(estimate_tokens(p.content) for p in system_parts)
+        attempts = list(self.attempts)
+        note = self._note(attempts, tool_result)
+        while len(attempts) > 1 and estimate_tokens(note) > budget:
+            attempts.pop(0)
+            note = self._note(attempts, tool_result)
+        if tool_result is not None and estimate_tokens(note) > budget:
+            without_result = self._note(attempts, "")
+            tool_result = _truncate(tool_result, budget - estimate_tokens(without_result))
+            note = self._note(attempts, tool_result)
+        note = _truncate(note, budget)
+
+        return [ModelRequest(parts=[*system_parts, UserPromptPart(note)])]
+
+    def _latest_attempt(
+        self, messages: list[ModelMessage]
+    ) -> tuple[str, str, str | None]:
+        prompt, answer, tool_result = "", "nothing", None
+        for message in messages:
+            for part in message.parts:
+                if isinstance(part, UserPromptPart) and isinstance(part.content, str):
+                    if not part.content.startswith(_NOTE_HEADER):
+                        prompt = part.content
+                elif isinstance(part, ToolReturnPart):
+                    if not part.tool_name.startswith(self.output_tool_prefix):
+                        tool_result = f"{part.tool_name}: {part.model_response_str()}"
+                elif isinstance(message, ModelResponse):
+                    if isinstance(part, ToolCallPart) and part.tool_name.startswith(
+                        self.output_tool_prefix
+                    ):
+                        answer = part.args_as_json_str()
+                    elif isinstance(part, TextPart):
+                        answer = part.content
+        return prompt, answer, tool_result
+
+    @staticmethod
+    def _note(attempts: list[str], tool_result: str | None) -> str:
+        lines = [_NOTE_HEADER, *attempts]
+        if tool_result:
+            lines.append(f"Latest tool result: {tool_result}")
+        return "\n".join(lines)
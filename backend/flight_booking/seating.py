@@ -0,0 +1,99 @@
+from __future__ import annotations as _annotations
+
+import re
+import threading
+
+SEAT_LETTERS = "ABCDEF"
+WINDOW_SEATS = "AF"
+
+_SEAT = re.compile(r"^(?:seat\s*)?(\d{1,2})\s*-?\s*([a-f])$", re.IGNORECASE)
+_LETTER_FIRST = re.compile(r"^(?:seat\s*)?([a-f])\s*-?\s*(\d{1,2})$", re.IGNORECASE)
+_ROW_AND_SEAT = re.compile(
+    r"^row\s*(\d{1,2})\s*,?\s*(?:and\s+)?seat\s*([a-f])$", re.IGNORECASE
+)
+
+
+def parse_seat(text: str, rows: int = 30) -> tuple[int, str] | None:
+    """Parse seat answers like "12A", "seat 12 a", "A12" or "row 12, seat A".
+
+    Returns `(row, letter)`, or None for anything else, e.g. "a window seat
+    near the front", which needs the seat preference agent.
+    """
+    text = text.strip().rstrip(".!")
+    if m := _SEAT.match(text) or _ROW_AND_SEAT.match(text):
+        row, letter = m.groups()
+    elif m := _LETTER_FIRST.match(text):
+        letter, row = m.groups()
+    else:
+        return None
+    if not 1 <= int(row) <= rows:
+        return None
+    return int(row), letter.upper()
+
+
+_BITS = {letter: 1 << i for i, letter in enumerate(SEAT_LETTERS)}
+_WINDOW_MASK = sum(_BITS[letter] for letter in WINDOW_SEATS)
+_ROW_MASK = sum(_BITS.values())
+
+
+class SeatMap:
+    """Taken seats on one flight, as a bitset per row.
+
+    Reservation is check-and-set under a lock, so two bookings can never get
+    the same seat.
+    """
+
+    def __init__(self, rows: int = 30):
+        self.rows = rows
+        # index 0 is unused so rows are 1-based like the seat numbers
+        self._taken = [0] * (rows + 1)
+        self._lock = threading.Lock()
+
+    def is_free(self, row: int, letter: str) -> bool:
+        return not self._taken[row] & _BITS[letter]
+
+    def reserve(self, row: int, letter: str) -> bool:
+        """Take the seat if it's free, returning whether it was."""
+        bit = _BITS[letter]
+        with self._lock:
+            if self._taken[row] & bit:
+                return False
+            self._taken[row] |= bit
+            return True
+
+    def release(self, row: int, letter: str) -> None:
+        with self._lock:
+            self._taken[row] &= ~_BITS[letter]
+
+    def free_count(self) -> int:
+        return self.rows * len(SEAT_LETTERS) - sum(
+            taken.bit_count() for taken in self._taken
+        )
+
+    def nearest_free(self, row: int = 1, window: bool = False) -> tuple[int, str] | None:
+        """The free seat closest to `row`, preferring the front on ties."""
+        mask = _WINDOW_MASK if window else _ROW_MASK
+        row = min(max(row, 1), self.rows)
+        for distance in range(self.rows):
+            for candidate in (row - distance, row + distance):
+                if not 1 <= candidate <= self.rows:
+                    continue
+                free = ~self._taken[candidate] & mask
+                if free:
+                    letter = SEAT_LETTERS[(free & -free).bit_length() - 1]
+                    return candidate, letter
+        return None
+
+    def nearest_free_window(self, row: int = 1) -> tuple[int, str] | None:
+        return self.nearest_free(row, window=True)
+
+    def reserve_nearest(self, row: int = 1) -> tuple[int, str] | None:
+        """Take the free seat closest to `row`, a window seat if any are left.
+
+        Returns None when the flight is full.
+        """
+        with self._lock:
+            seat = self.nearest_free_window(row) or self.nearest_free(row)
+            if seat is not None:
+                self._taken[seat[0]] |= _BITS[seat[1]]
+            return seat
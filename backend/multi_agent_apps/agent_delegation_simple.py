@@ -1,6 +1,7 @@
 from dataclasses import dataclass
 import httpx
 
+from core.http_clients import http_clients
 from pydantic_ai import Agent, RunContext
 # from pydantic_ai.usage import UsageLimits
 
@@ -50,8 +51,8 @@ async def joke_factory(ctx: RunContext[ClientAndKey], count: int) -> str:
 # #> RunUsage(input_tokens=204, output_tokens=24, requests=3)
 
 async def main():
-    async with httpx.AsyncClient() as client: 
-        deps = ClientAndKey(client, 'foobar')
+    async with http_clients.lifespan():
+        deps = ClientAndKey(http_clients.get(), 'foobar')
         result = await joke_selection_agent.run('Tell me a joke.', deps=deps)
         print(result.output)
         #> Did you hear about the toothpaste scandal? They called it Colgate.
@@ -0,0 +1,240 @@
+"""Static checks on generated SQL before it is sent to Postgres.
+
+A small tokenizer is enough to catch the usual mistakes, several statements,
+writes, unknown tables and misspelled columns, and tell the model exactly
+what to fix without a database round trip. It errs on the side of letting a
+query through: anything it can't classify is left to `EXPLAIN`.
+"""
+
+from __future__ import annotations as _annotations
+
+import re
+
+from pydantic_ai import ModelRetry
+
+_TOKEN = re.compile(
+    r"""
+    (?P<space>\s+|--[^\n]*|/\*.*?\*/)
+    | (?P<string>(?:[eE])?'(?:[^']|'')*')
+    | (?P<dollar>\$(?P<tag>\w*)\$.*?\$(?P=tag)\$)
+    | (?P<quoted>"(?:[^"]|"")+")
+    | (?P<number>\d+(?:\.\d+)?)
+    | (?P<param>\$\d+)
+    | (?P<word>[A-Za-z_][A-Za-z0-9_$]*)
+    | (?P<cast>::)
+    | (?P<op>[(),;.*\[\]:]|[^\sA-Za-z0-9_'"(),;.*\[\]:]+)
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+_CREATE_TABLE = re.compile(
+    r"CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)\s*\((.*?)\);",
+    re.IGNORECASE | re.DOTALL,
+)
+
+WRITE_KEYWORDS = frozenset(
+    [
+        "insert", "update", "delete", "merge", "upsert", "drop", "alter", "create",
+        "truncate", "grant", "revoke", "copy", "call", "do", "vacuum", "analyze",
+        "cluster", "reindex", "comment", "lock", "refresh", "into",
+    ]
+)  # fmt: skip
+
+# words that can appear where a column could, but aren't columns
+_KEYWORDS = frozenset(
+    [
+        "select", "with", "recursive", "as", "from", "where", "and", "or", "not", "is",
+        "null", "true", "false", "in", "like", "ilike", "similar", "to", "between",
+        "case", "when", "then", "else", "end", "on", "using", "join", "inner", "left",
+        "right", "full", "outer", "cross", "natural", "lateral", "group", "by",
+        "having", "order", "asc", "desc", "nulls", "first", "last", "limit", "offset",
+        "fetch", "next", "rows", "row", "only", "distinct", "all", "any", "some",
+        "exists", "union", "intersect", "except", "cast", "interval", "date", "time",
+        "timestamp", "timestamptz", "zone", "at", "current_date", "current_time",
+        "current_timestamp", "localtime", "localtimestamp", "now", "filter", "over",
+        "partition", "window", "range", "unbounded", "preceding", "following",
+        "current", "escape", "collate", "array", "values", "default", "both", "leading",
+        "trailing", "epoch", "century", "decade", "year", "quarter", "month", "week",
+        "day", "hour", "minute", "second", "milliseconds", "microseconds", "dow", "doy",
+        "isodow", "isoyear", "timezone", "precision", "varying",
+    ]
+)  # fmt: skip
+
+
+def parse_schema(ddl: str) -> dict[str, set[str]]:
+    """Column names of every table created in `ddl`."""
+    return {
+        table.lower(): {
+            line.split()[0].strip('"').lower()
+            for line in body.split(",")
+            if line.strip()
+        }
+        for table, body in _CREATE_TABLE.findall(ddl)
+    }
+
+
+def _tokenize(sql: str) -> list[tuple[str, str]]:
+    tokens = []
+    for m in _TOKEN.finditer(sql):
+        kind = m.lastgroup
+        assert kind is not None  # every alternative is a named group
+        if kind == "tag":
+            kind = "dollar"
+        if kind != "space":
+            tokens.append((kind, m.group()))
+    return tokens
+
+
+def _name(kind: str, text: str) -> str:
+    return text[1:-1].replace('""', '"') if kind == "quoted" else text.lower()
+
+
+def _column_list(tokens: list[tuple[str, str]], start: int) -> list[str]:
+    """The names in a `(a, b, ...)` list starting at `start`, or [] if it isn't one."""
+    names: list[str] = []
+    for kind, text in tokens[start:]:
+        if (kind, text) == ("op", ")"):
+            return names
+        if kind in ("word", "quoted"):
+            names.append(_name(kind, text))
+        elif (kind, text) != ("op", ","):
+            return []
+    return []
+
+
+def _is_column_list(tokens: list[tuple[str, str]], i: int, prev: tuple[str, str]) -> bool:
+    """Whether the parens after `tokens[i]` name columns, not a function's arguments.
+
+    That's an alias's columns, `AS t(a, b)` or `unnest(x) t(a)`, or a CTE's,
+    `WITH t(a, b) AS (...)`.
+    """
+    if (prev[0] == "word" and prev[1].lower() == "as") or prev == ("op", ")"):
+        return True
+    depth = 0
+    for j in range(i + 1, len(tokens)):
+        if tokens[j] == ("op", "("):
+            depth += 1
+        elif tokens[j] == ("op", ")"):
+            depth -= 1
+            if not depth:
+                after = tokens[j + 1 : j + 3]
+                return (
+                    len(after) == 2
+                    and after[0][0] == "word"
+                    and after[0][1].lower() == "as"
+                    and after[1] == ("op", "(")
+                )
+    return False
+
+
+def validate_query(sql: str, tables: dict[str, set[str]]) -> None:
+    """Raise `ModelRetry` explaining what's wrong with `sql`, if anything.
+
+    Checks that it's a single read-only SELECT (or WITH ... SELECT) that only
+    reads from `tables` and only refers to their columns.
+    """
+    tokens = _tokenize(sql)
+    while tokens and tokens[-1] == ("op", ";"):
+        tokens.pop()
+    if not tokens:
+        raise ModelRetry("The SQL query is empty.")
+
+    statements = 1 + sum(token == ("op", ";") for token in tokens)
+    if statements > 1:
+        raise ModelRetry(
+            f"Please write a single SQL statement, this has {statements} separated by `;`."
+        )
+
+    first = tokens[0][1].lower()
+    if first not in ("select", "with"):
+        raise ModelRetry(f"Please create a SELECT query, not {first.upper()}.")
+    for kind, text in tokens:
+        if kind == "word" and text.lower() in WRITE_KEYWORDS:
+            raise ModelRetry(
+                f"Only read-only SELECT queries are allowed, remove {text.upper()}."
+            )
+
+    # names the query defines itself: CTEs, aliases and function names
+    defined: set[str] = set()
+    for i, (kind, text) in enumerate(tokens):
+        if kind not in ("word", "quoted"):
+            continue
+        name = _name(kind, text)
+        prev = tokens[i - 1] if i else ("", "")
+        following = tokens[i + 1] if i + 1 < len(tokens) else ("", "")
+        if following == ("op", "("):
+            defined.add(name)  # a function call, or a CTE name with column list
+            if _is_column_list(tokens, i, prev):
+                defined.update(_column_list(tokens, i + 2))
+        elif prev[0] == "word" and prev[1].lower() == "as":
+            defined.add(name)
+        elif following[0] == "word" and following[1].lower() == "as":
+            defined.add(name)  # CTE name in `WITH name AS (`
+        elif (
+            (prev[0] == "word" and prev[1].lower() not in _KEYWORDS)
+            or prev[0] in ("quoted", "string", "number")
+            or prev == ("op", ")")
+        ) and (kind == "quoted" or name not in _KEYWORDS):
+            defined.add(name)  # implicit alias, e.g. `FROM records r`
+
+    known_tables = ", ".join(f"`{t}`" for t in sorted(tables))
+    columns = set().union(*tables.values()) if tables else set()
+
+    # what opened each enclosing paren: a function call's FROM (`EXTRACT(day
+    # FROM ...)`) doesn't name a table
+    parens: list[bool] = []
+    # expecting a table name next, and whether a comma would start another
+    expect_table = from_list = False
+    for i, (kind, text) in enumerate(tokens):
+        prev = tokens[i - 1] if i else ("", "")
+        following = tokens[i + 1] if i + 1 < len(tokens) else ("", "")
+        word = text.lower() if kind == "word" else None
+        if (kind, text) == ("op", "("):
+            call = prev[0] in ("word", "quoted") and prev[1].lower() not in _KEYWORDS
+            parens.append(call)
+            expect_table = from_list = False
+            continue
+        if (kind, text) == ("op", ")"):
+            if parens:
+                parens.pop()
+            continue
+        if word in ("from", "join"):
+            expect_table = not (parens and parens[-1])
+            continue
+        if (kind, text) == ("op", ",") and from_list:
+            expect_table = True
+            continue
+        if expect_table and kind in ("word", "quoted"):
+            if following == ("op", "."):
+                continue  # schema qualifier
+            expect_table, from_list = False, True
+            name = _name(kind, text)
+            if following == ("op", "(") or name in tables or name in defined:
+                continue
+            raise ModelRetry(
+                f"Unknown table `{name}`. The available tables are {known_tables}."
+            )
+        expect_table = expect_table and (kind, text) == ("op", ".")
+        if kind == "op" or (word in _KEYWORDS and word != "as"):
+            from_list = False
+
+        if kind not in ("word", "quoted") or prev == ("cast", "::"):
+            continue  # a type name after `::` isn't a column
+        if prev == ("op", "(") and i > 1 and tokens[i - 2][1].lower() == "extract":
+            continue  # the field in `EXTRACT(field FROM ...)`
+        if kind == "word" and word in _KEYWORDS:
+            continue
+        name = _name(kind, text)
+        if following in (("op", "("), ("op", ".")) or name in defined:
+            continue
+        if prev == ("op", ".") and _name(*tokens[i - 2]) not in tables:
+            continue  # qualified by an alias whose columns we can't know
+        if name in columns or name in tables:
+            continue
+        if len(tables) == 1:
+            table, table_columns = next(iter(tables.items()))
+            listed = ", ".join(sorted(table_columns))
+            raise ModelRetry(
+                f"Unknown column `{name}`. The columns of `{table}` are: {listed}."
+            )
+        raise ModelRetry(f"Unknown column `{name}`.")
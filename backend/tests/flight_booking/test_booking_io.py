@@ -0,0 +1,29 @@
+import asyncio
+
+import pytest
+
+from flight_booking.booking_io import QueueIO, ScriptedIO
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_scripted_io_records_transcript():
+    io = ScriptedIO(["yes"])
+    assert await io.ask("Buy?", choices=["yes", "no"]) == "yes"
+    io.say("Booked.")
+    assert io.transcript == ["Buy?", "yes", "Booked."]
+    with pytest.raises(EOFError):
+        await io.ask("Seat?")
+
+
+async def test_queue_io_waits_for_a_valid_answer():
+    io = QueueIO()
+    answer = asyncio.create_task(io.ask("Buy?", choices=["yes", "no"]))
+    assert await io.outbox.get() == "Buy?"
+
+    await io.answer("maybe")
+    assert await io.outbox.get() == "Please answer one of: yes, no"
+    assert not answer.done()
+
+    await io.answer("no")
+    assert await answer == "no"
@@ -0,0 +1,75 @@
+import asyncio
+import datetime
+
+import pytest
+
+from core.usage_ledger import UsageLedger
+from flight_booking.booking_io import ScriptedIO
+from flight_booking.flight_booking_agent import (
+    BookingSession,
+    Deps,
+    FlightDetails,
+    SeatPreference,
+    find_seat,
+)
+from flight_booking.seating import SEAT_LETTERS, WINDOW_SEATS, SeatMap
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_find_seat_without_window_seats_assigns_nearest_free_seat():
+    seats = SeatMap()
+    for row in range(1, seats.rows + 1):
+        for letter in WINDOW_SEATS:
+            seats.reserve(row, letter)
+
+    io = ScriptedIO(["1A", "2F", "3A"])
+    seat = await find_seat(UsageLedger(), seats, io)
+    assert seat == SeatPreference(row=10, seat="B")
+    assert not seats.is_free(10, "B")
+    assert "Max retries reached. Assigning seat 10B." in io.transcript
+
+
+async def test_find_seat_on_a_full_flight_books_nothing():
+    seats = SeatMap(rows=1)
+    for letter in SEAT_LETTERS:
+        seats.reserve(1, letter)
+
+    io = ScriptedIO([])
+    assert await find_seat(UsageLedger(), seats, io) is None
+    assert io.transcript == ["Sorry, this flight is full."]
+
+
+async def test_cancelled_session_resumes_at_the_same_question():
+    flight = FlightDetails(
+        flight_number="TEST1",
+        price=350,
+        origin="SFO",
+        destination="ANC",
+        date=datetime.date(2025, 1, 10),
+    )
+    deps = Deps("SFO", "ANC", flight.date, [flight])
+    io = ScriptedIO(["yes", "12A"], delay=0.01)
+    # past the search, which needs the model
+    session = BookingSession(deps, io=io, stage="confirm", flight=flight)
+
+    task = asyncio.create_task(session.run())
+    while session.stage != "seat":
+        await asyncio.sleep(0.001)
+    task.cancel()  # e.g. the client disconnected while being asked for a seat
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert session.seat is None
+
+    await session.run()
+    assert session.stage == "done"
+    assert session.seat == SeatPreference(row=12, seat="A")
+    seat_question = "What seat would you like? (e.g., 12A)"
+    assert io.transcript == [
+        "Do you want to buy this flight? (yes/no)",
+        "yes",
+        seat_question,
+        seat_question,
+        "12A",
+        "Purchasing flight TEST1 with seat 12A...",
+    ]
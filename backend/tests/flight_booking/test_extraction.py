@@ -0,0 +1,141 @@
+import asyncio
+
+import pytest
+from pydantic import BaseModel, TypeAdapter
+
+from flight_booking.extraction import (
+    ExtractionCache,
+    ExtractionStats,
+    content_key,
+    extract_cached,
+    split_flight_blocks,
+)
+
+PAGE = """
+1. Flight SFO-AK123
+- Price: $350
+
+2. Flight NYC-LA101
+- Price: $250
+"""
+
+
+class Flight(BaseModel):
+    flight_number: str
+
+
+def test_split_flight_blocks():
+    assert split_flight_blocks(PAGE) == [
+        "1. Flight SFO-AK123\n- Price: $350",
+        "2. Flight NYC-LA101\n- Price: $250",
+    ]
+    assert split_flight_blocks("Flights from SFO:\n" + PAGE) == split_flight_blocks(PAGE)
+    assert split_flight_blocks("  no listing here ") == ["no listing here"]
+    assert split_flight_blocks("") == []
+
+
+def test_content_key_ignores_position_and_whitespace():
+    assert content_key("1. Flight A\n- Price: $1") == content_key("7.  Flight A - Price: $1")
+    assert content_key("1. Flight A") != content_key("1. Flight B")
+
+
+class PricedFlight(BaseModel):
+    flight_number: str
+    price: int
+
+
+def test_changing_the_model_starts_a_fresh_cache(tmp_path):
+    path = tmp_path / "extraction.sqlite3"
+    ExtractionCache(TypeAdapter(list[Flight]), path).set("k", [Flight(flight_number="A1")])
+    assert ExtractionCache(TypeAdapter(list[Flight]), path).get("k") == [
+        Flight(flight_number="A1")
+    ]
+    # results without a price must not be loaded as PricedFlight
+    assert ExtractionCache(TypeAdapter(list[PricedFlight]), path).get("k") is None
+
+
+@pytest.mark.asyncio
+async def test_only_changed_blocks_are_extracted(tmp_path):
+    calls: list[str] = []
+
+    async def extract(text: str) -> list[Flight]:
+        calls.append(text)
+        return [Flight(flight_number=text.split()[2])]
+
+    path = tmp_path / "extraction.sqlite3"
+    cache = ExtractionCache(TypeAdapter(list[Flight]), path)
+    first = await extract_cached(PAGE, extract, cache)
+    assert [f.flight_number for f in first] == ["SFO-AK123", "NYC-LA101"]
+    assert len(calls) == 2
+
+    # same page from a fresh process: one lookup, no extraction
+    cache = ExtractionCache(TypeAdapter(list[Flight]), path)
+    assert await extract_cached(PAGE, extract, cache) == first
+    assert len(calls) == 2
+
+    changed = PAGE.replace("NYC-LA101\n- Price: $250", "NYC-LA102\n- Price: $260")
+    stats = ExtractionStats()
+    flights = await extract_cached(changed, extract, cache, stats=stats)
+    assert [f.flight_number for f in flights] == ["SFO-AK123", "NYC-LA102"]
+    assert len(calls) == 3
+    assert stats.as_dict() == {
+        "cached_pages": 0,
+        "cached_blocks": 1,
+        "parsed_blocks": 0,
+        "extracted_blocks": 1,
+        "duplicates": 0,
+    }
+
+
+@pytest.mark.asyncio
+async def test_blocks_extracted_concurrently_and_deduped():
+    page = "\n".join(f"{i}. Flight F{i % 3}\n- Price: ${i}" for i in range(1, 10))
+    running = peak = 0
+
+    async def extract(text: str) -> list[Flight]:
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return [Flight(flight_number=text.split()[2])]
+
+    cache = ExtractionCache(TypeAdapter(list[Flight]))
+    stats = ExtractionStats()
+    flights = await extract_cached(
+        page, extract, cache, concurrency=3, key=lambda f: f.flight_number, stats=stats
+    )
+    assert [f.flight_number for f in flights] == ["F1", "F2", "F0"]
+    assert peak == 3
+    assert stats.as_dict() == {
+        "cached_pages": 0,
+        "cached_blocks": 0,
+        "parsed_blocks": 0,
+        "extracted_blocks": 9,
+        "duplicates": 6,
+    }
+
+
+@pytest.mark.asyncio
+async def test_parsed_blocks_skip_the_extractor():
+    calls: list[str] = []
+
+    async def extract(text: str) -> list[Flight]:
+        calls.append(text)
+        return [Flight(flight_number="LLM")]
+
+    def parse(text: str) -> list[Flight] | None:
+        return [Flight(flight_number="LOCAL")] if "SFO" in text else None
+
+    cache = ExtractionCache(TypeAdapter(list[Flight]))
+    stats = ExtractionStats()
+    flights = await extract_cached(PAGE, extract, cache, parse=parse, stats=stats)
+    assert [f.flight_number for f in flights] == ["LOCAL", "LLM"]
+    assert calls == ["2. Flight NYC-LA101\n- Price: $250"]
+    assert stats.parsed_blocks == stats.extracted_blocks == 1
+
+    # a second run is counted on its own
+    stats = ExtractionStats()
+    await extract_cached(PAGE, extract, cache, parse=parse, stats=stats)
+    assert stats.parsed_blocks == stats.extracted_blocks == stats.cached_blocks == 0
+    assert stats.cached_pages == 1
@@ -0,0 +1,40 @@
+import datetime
+from types import SimpleNamespace
+
+from flight_booking.flight_index import FlightIndex
+
+JAN_10 = datetime.date(2025, 1, 10)
+
+
+def flight(number: str, price: int, origin="SFO", destination="ANC", date=JAN_10):
+    return SimpleNamespace(
+        flight_number=number,
+        price=price,
+        origin=origin,
+        destination=destination,
+        date=date,
+    )
+
+
+def test_search_cheapest_first_with_filters():
+    index = FlightIndex(
+        [
+            flight("AK123", 350),
+            flight("LA101", 250),
+            flight("AK999", 300),
+            flight("AK456", 370, destination="FAI"),
+            flight("AK124", 100, date=datetime.date(2025, 1, 11)),
+        ]
+    )
+    assert len(index) == 5
+
+    def numbers(flights: list) -> list[str]:
+        return [f.flight_number for f in flights]
+
+    assert numbers(index.search("SFO", "ANC", JAN_10)) == ["LA101", "AK999", "AK123"]
+    assert numbers(index.search("sfo", "anc", JAN_10, limit=1)) == ["LA101"]
+    assert numbers(index.search("SFO", "ANC", JAN_10, max_price=300)) == ["LA101", "AK999"]
+    assert index.search("SFO", "ANC", JAN_10, max_price=50) == []
+    assert index.search("BOS", "ANC", JAN_10, max_price=500) == []
+    assert index.cheapest("SFO", "FAI", JAN_10).flight_number == "AK456"
+    assert index.cheapest("SFO", "JNU", JAN_10) is None
@@ -0,0 +1,30 @@
+import datetime
+
+from flight_booking.flight_parser import parse_flight_block
+
+BLOCK = """4. Flight NYC-LA101
+- Price: $1,250
+- Origin: San Francisco International Airport (SFO)
+- Destination: Ted Stevens Anchorage International Airport (ANC)
+- Date: January 10, 2025"""
+
+
+def test_parse_well_formed_block():
+    assert parse_flight_block(BLOCK) == {
+        "flight_number": "NYC-LA101",
+        "price": 1250,
+        "origin": "SFO",
+        "destination": "ANC",
+        "date": datetime.date(2025, 1, 10),
+    }
+    iso = BLOCK.replace("January 10, 2025", "2025-01-10")
+    assert parse_flight_block(iso)["date"] == datetime.date(2025, 1, 10)
+
+
+def test_unusual_blocks_are_left_to_the_model():
+    # missing airport code, fractional price, unknown date, two flights in one block
+    assert parse_flight_block(BLOCK.replace("(SFO)", "")) is None
+    assert parse_flight_block(BLOCK.replace("$1,250", "$1,250.99")) is None
+    assert parse_flight_block(BLOCK.replace("January 10, 2025", "next Friday")) is None
+    assert parse_flight_block(BLOCK + "\n" + BLOCK) is None
+    assert parse_flight_block("Cheap flights to Alaska!") is None
@@ -0,0 +1,57 @@
+from pydantic_ai.messages import (
+    ModelRequest,
+    ModelResponse,
+    SystemPromptPart,
+    ToolCallPart,
+    ToolReturnPart,
+    UserPromptPart,
+)
+
+from flight_booking.retry_history import CompactRetryHistory, estimate_tokens
+
+
+def attempt(prompt: str, result: str, system: bool = True) -> list:
+    request_parts = [UserPromptPart(prompt)]
+    if system:
+        request_parts.insert(0, SystemPromptPart("Find the cheapest flight."))
+    return [
+        ModelRequest(parts=request_parts),
+        ModelResponse(parts=[ToolCallPart("flight_search", {}, tool_call_id="1")]),
+        ModelRequest(parts=[ToolReturnPart("flight_search", result, tool_call_id="1")]),
+        ModelResponse(parts=[ToolCallPart("final_result_NoFlightFound", {}, "2")]),
+        ModelRequest(
+            parts=[ToolReturnPart("final_result_NoFlightFound", "Please try again.", "2")]
+        ),
+    ]
+
+
+def test_history_stays_one_request_with_system_prompt():
+    policy = CompactRetryHistory(max_tokens=1000)
+    history = policy(attempt("SFO to ANC", "[AK123]"))
+    for n in range(2, 8):
+        history = policy(history + attempt(f"try {n}", f"[AK{n}]", system=False))
+
+    assert len(history) == 1
+    system, note = history[0].parts
+    assert system.content == "Find the cheapest flight."
+    assert note.content.splitlines() == [
+        "Earlier attempts that were rejected:",
+        "- asked 'try 3', answered {}",
+        "- asked 'try 4', answered {}",
+        "- asked 'try 5', answered {}",
+        "- asked 'try 6', answered {}",
+        "- asked 'try 7', answered {}",
+        "Latest tool result: flight_search: [AK7]",
+    ]
+
+
+def test_token_ceiling_drops_old_attempts_then_trims_tool_result():
+    policy = CompactRetryHistory(max_tokens=60)
+    history = policy(attempt("first", "x" * 40))
+    history = policy(history + attempt("second", "y" * 1000, system=False))
+
+    system, note = history[0].parts
+    assert estimate_tokens(system.content) + estimate_tokens(note.content) <= 60
+    assert "first" not in note.content
+    assert "- asked 'second', answered {}" in note.content
+    assert note.content.endswith("yyy...")
@@ -0,0 +1,57 @@
+from flight_booking.seating import SeatMap, parse_seat
+
+
+def test_parse_seat_formats():
+    assert parse_seat("12A") == (12, "A")
+    assert parse_seat(" seat 12 f. ") == (12, "F")
+    assert parse_seat("b7") == (7, "B")
+    assert parse_seat("Row 3, seat C") == (3, "C")
+    assert parse_seat("12G") is None
+    assert parse_seat("31A") is None
+    assert parse_seat("a window seat near the front") is None
+
+
+def test_reserve_is_exclusive():
+    seats = SeatMap(rows=2)
+    assert seats.free_count() == 12
+    assert seats.reserve(1, "A")
+    assert not seats.reserve(1, "A")
+    assert not seats.is_free(1, "A")
+    assert seats.free_count() == 11
+
+    seats.release(1, "A")
+    assert seats.is_free(1, "A")
+
+
+def test_nearest_free_window():
+    seats = SeatMap(rows=5)
+    for row in (2, 3, 4):
+        seats.reserve(row, "A")
+        seats.reserve(row, "F")
+    assert seats.nearest_free_window(3) == (1, "A")
+    seats.reserve(1, "A")
+    assert seats.nearest_free_window(3) == (1, "F")
+    seats.reserve(1, "F")
+    assert seats.nearest_free_window(3) == (5, "A")
+    seats.reserve(5, "A")
+    seats.reserve(5, "F")
+    assert seats.nearest_free_window(3) is None
+
+
+def test_reserve_nearest_falls_back_to_any_seat():
+    seats = SeatMap(rows=2)
+    for row in (1, 2):
+        for letter in "AF":
+            seats.reserve(row, letter)
+    assert seats.reserve_nearest(2) == (2, "B")
+    assert not seats.is_free(2, "B")
+    while seats.free_count():
+        assert seats.reserve_nearest(1) is not None
+    assert seats.reserve_nearest(1) is None
+
+
+def test_nearest_to_a_row_beyond_the_map():
+    seats = SeatMap(rows=5)
+    assert seats.nearest_free_window(10) == (5, "A")
+    assert seats.reserve_nearest(10) == (5, "A")
+    assert seats.reserve_nearest(0) == (1, "A")
@@ -0,0 +1,94 @@
+import pytest
+from pydantic_ai import ModelRetry
+
+from sql_gen.sql_validation import _tokenize, parse_schema, validate_query
+
+SCHEMA = parse_schema(
+    """
+CREATE TABLE records (
+    start_timestamp timestamptz,
+    level log_level,
+    message text,
+    attributes jsonb,
+    tags text[]
+);
+"""
+)
+
+
+def test_casts_and_subscripts_are_separate_tokens():
+    assert _tokenize("tags @> ARRAY['foo']::text[]") == [
+        ("word", "tags"),
+        ("op", "@>"),
+        ("word", "ARRAY"),
+        ("op", "["),
+        ("string", "'foo'"),
+        ("op", "]"),
+        ("cast", "::"),
+        ("word", "text"),
+        ("op", "["),
+        ("op", "]"),
+    ]
+
+
+def test_parse_schema():
+    assert SCHEMA == {
+        "records": {"start_timestamp", "level", "message", "attributes", "tags"}
+    }
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        "SELECT * FROM records WHERE attributes->>'foobar' = false",
+        "SELECT * FROM records WHERE attributes ? 'foobar';",
+        "SELECT * FROM records WHERE start_timestamp::date > CURRENT_TIMESTAMP - INTERVAL '1 day'",
+        "SELECT * FROM records WHERE level = 'error' and 'foobar' = ANY(tags)",
+        "SELECT r.level, count(*) AS n FROM records r GROUP BY r.level ORDER BY n DESC",
+        (
+            "WITH recent AS (SELECT * FROM records) "
+            "SELECT EXTRACT(epoch FROM start_timestamp) FROM recent"
+        ),
+        "SELECT * FROM records, jsonb_each(attributes) kv WHERE kv.key = 'x'",
+        "select \"message\" from records -- trailing; comment",
+        "SELECT * FROM records WHERE message SIMILAR TO '%(error|fail)%'",
+        "SELECT * FROM records WHERE tags @> ARRAY['foo']::text[]",
+        "SELECT tags[1:2], attributes::jsonb FROM records",
+        "SELECT tag FROM records, unnest(tags) AS t(tag)",
+        "SELECT tag FROM records, unnest(tags) t(tag)",
+        "WITH levels(name) AS (SELECT level FROM records) SELECT name FROM levels",
+        "SELECT EXTRACT(MILLISECOND FROM start_timestamp) FROM records",
+    ],
+)
+def test_valid_queries_pass(sql: str):
+    validate_query(sql, SCHEMA)
+
+
+@pytest.mark.parametrize(
+    "sql, message",
+    [
+        ("", "The SQL query is empty."),
+        ("SELECT 1; DROP TABLE records", "Please write a single SQL statement, this has 2"),
+        ("DELETE FROM records", "Please create a SELECT query, not DELETE."),
+        (
+            "SELECT * INTO backup FROM records",
+            "Only read-only SELECT queries are allowed, remove INTO.",
+        ),
+        (
+            "WITH d AS (DELETE FROM records RETURNING *) SELECT * FROM d",
+            "Only read-only SELECT queries are allowed, remove DELETE.",
+        ),
+        ("SELECT * FROM logs", "Unknown table `logs`. The available tables are `records`."),
+        ("SELECT * FROM records, logs", "Unknown table `logs`."),
+        (
+            "SELECT * FROM records WHERE levl = 'error'",
+            "Unknown column `levl`. The columns of `records` are: attributes, level,",
+        ),
+        ("SELECT records.severity FROM records", "Unknown column `severity`."),
+        ("SELECT count(levl) AS n FROM records", "Unknown column `levl`."),
+    ],
+)
+def test_invalid_queries_explain_the_problem(sql: str, message: str):
+    with pytest.raises(ModelRetry) as exc_info:
+        validate_query(sql, SCHEMA)
+    assert exc_info.value.message.startswith(message)
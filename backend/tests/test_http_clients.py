@@ -0,0 +1,22 @@
+import pytest
+
+from core.config import Settings
+from core.http_clients import ClientRegistry
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_registry_shares_clients_until_shutdown():
+    registry = ClientRegistry(
+        Settings(HTTP_HOST_LIMITS={"https://geocode.maps.co": 3}, HTTP_HTTP2=False)
+    )
+
+    async with registry.lifespan():
+        client = registry.get()
+        assert registry.get() is client
+        assert registry.get("other") is not client
+        assert client.timeout.connect == 5.0
+
+    assert client.is_closed
+    assert registry.get() is not client
+    await registry.shutdown()
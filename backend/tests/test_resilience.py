@@ -0,0 +1,60 @@
+import asyncio
+
+import httpx
+import pytest
+
+from core.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    Upstream,
+    UpstreamTimeout,
+)
+
+pytestmark = pytest.mark.asyncio
+
+
+def slow_transport(delays: list[float]) -> httpx.MockTransport:
+    """Respond after the next delay in `delays`, one per request."""
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(delays.pop(0))
+        return httpx.Response(200, json={"ok": True})
+
+    return httpx.MockTransport(handler)
+
+
+async def test_budget_exceeded_opens_circuit():
+    upstream = Upstream(
+        "geocode",
+        budget=0.05,
+        breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60),
+        hedge_quantile=None,
+    )
+    async with httpx.AsyncClient(transport=slow_transport([1, 1, 1])) as client:
+
+        async def request():
+            return (await client.get("https://geocode.maps.co/search")).json()
+
+        for _ in range(2):
+            with pytest.raises(UpstreamTimeout):
+                await upstream.call(request)
+        with pytest.raises(CircuitOpenError):
+            await upstream.call(request)
+
+
+async def test_hedged_request_beats_slow_tail():
+    upstream = Upstream("weather", budget=1, hedge_min_samples=3)
+    for _ in range(3):
+        upstream.latency.observe(0.01)
+
+    # the first request hangs, the hedge sent after ~p95 answers quickly
+    async with httpx.AsyncClient(transport=slow_transport([0.5, 0.01])) as client:
+
+        async def request():
+            return (await client.get("http://api.tomorrow.io/v4/weather/realtime")).json()
+
+        started = asyncio.get_running_loop().time()
+        assert await upstream.call(request) == {"ok": True}
+        assert asyncio.get_running_loop().time() - started < 0.2
+    assert upstream.hedges == 1
+    assert not upstream.breaker.is_open
@@ -0,0 +1,91 @@
+import asyncio
+import json
+
+import pytest
+from pydantic_ai import Agent
+from pydantic_ai.exceptions import UsageLimitExceeded
+from pydantic_ai.models.test import TestModel
+from pydantic_ai.usage import UsageLimits
+
+from core.usage_ledger import UsageLedger, aggregate, timed_tool
+
+pytestmark = pytest.mark.asyncio
+
+
+def build_agent() -> Agent:
+    agent = Agent(TestModel())
+
+    @agent.tool_plain
+    def lookup() -> str:
+        return "found"
+
+    return agent
+
+
+async def test_stages_are_charged_separately(tmp_path):
+    agent = build_agent()
+    ledger = UsageLedger()
+
+    with ledger.stage("search", agent="search_agent") as stage:
+        result = await agent.run("search", usage=ledger.usage)
+        stage.record_messages(result.new_messages())
+    with ledger.stage("local"):
+        pass
+
+    report = ledger.report()
+    search = report["stages"]["search"]
+    assert search["agent"] == "search_agent"
+    assert search["runs"] == 1
+    assert search["requests"] == 2
+    assert search["tools"] == {"lookup": 1}
+    assert search["input_tokens"] == report["total"]["input_tokens"] > 0
+    assert report["stages"]["local"]["requests"] == 0
+
+    path = tmp_path / "usage.jsonl"
+    ledger.dump(path)
+    ledger.dump(path)
+    reports = [json.loads(line) for line in path.read_text().splitlines()]
+    totals = aggregate(reports)
+    assert totals["runs"] == 2
+    assert totals["stages"]["search"]["requests"] == 4
+    assert totals["stages"]["search"]["tools"] == {"lookup": 2}
+
+
+async def test_limits_apply_across_stages():
+    agent = build_agent()
+    ledger = UsageLedger(limits=UsageLimits(request_limit=3))
+
+    with ledger.stage("first"):
+        await agent.run("one", usage=ledger.usage, usage_limits=ledger.limits)
+    with pytest.raises(UsageLimitExceeded), ledger.stage("second"):
+        await agent.run("two", usage=ledger.usage, usage_limits=ledger.limits)
+    # the failed stage is still charged for what it used
+    assert ledger.stages["second"].requests == 1
+
+
+async def test_timed_tools_charge_their_stage():
+    agent = Agent(TestModel())
+
+    @agent.tool_plain
+    @timed_tool
+    async def slow_lookup(city: str) -> str:
+        """Look up a city."""
+        await asyncio.sleep(0.01)
+        return city
+
+    ledger = UsageLedger()
+    with ledger.stage("search", agent="search_agent") as stage:
+        result = await agent.run("search", usage=ledger.usage)
+        stage.record_messages(result.new_messages())
+    assert stage.tools == {"slow_lookup": 1}
+    assert stage.tool_time["slow_lookup"] >= 0.01
+    tool_time = dict(stage.tool_time)
+
+    # outside a stage the tool still works, untimed
+    await agent.run("search")
+    assert stage.tool_time == tool_time
+
+    report = ledger.report()
+    assert aggregate([report, report])["stages"]["search"]["tool_time"] == {
+        "slow_lookup": round(2 * report["stages"]["search"]["tool_time"]["slow_lookup"], 3)
+    }
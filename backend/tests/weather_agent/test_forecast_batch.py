@@ -0,0 +1,124 @@
+import asyncio
+
+import pytest
+
+from weather_forecast.forecast_batch import ForecastBatchEngine, canonical_prompt
+
+
+@pytest.mark.asyncio
+async def test_bounded_concurrency_batched_writes_and_retries():
+    running = peak = 0
+    attempts: dict[str, int] = {}
+    batches: list[list[tuple[int, str]]] = []
+
+    async def run(prompt: str) -> str:
+        nonlocal running, peak
+        attempts[prompt] = attempts.get(prompt, 0) + 1
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.001)
+        running -= 1
+        if prompt == "flaky" and attempts[prompt] == 1:
+            raise TimeoutError("provider hiccup")
+        if prompt == "broken":
+            raise ConnectionError("always fails")
+        return f"forecast for {prompt}"
+
+    async def store(rows: list[tuple[int, str]]) -> None:
+        batches.append(list(rows))
+
+    prompts = [(f"city {i}", i) for i in range(50)] + [("flaky", 50), ("broken", 51)]
+    engine = ForecastBatchEngine(
+        run, store, concurrency=4, batch_size=20, max_retries=1, retry_backoff=0
+    )
+    stats = await engine.run(prompts)
+
+    assert peak == 4
+    assert all(len(batch) <= 20 for batch in batches)
+    assert sorted(user_id for batch in batches for user_id, _ in batch) == list(range(51))
+    assert stats.as_dict() | {"elapsed": 0, "per_second": 0} == {
+        "submitted": 52,
+        "deduplicated": 0,
+        "completed": 51,
+        "failed": 1,
+        "retries": 2,
+        "stored": 51,
+        "store_batches": len(batches),
+        "elapsed": 0,
+        "per_second": 0,
+    }
+    assert stats.failures == [(51, "ConnectionError('always fails')")]
+
+
+def test_canonical_prompt():
+    assert canonical_prompt("  Weather in   London tomorrow? ") == canonical_prompt(
+        "weather in london tomorrow"
+    )
+    assert canonical_prompt("Weather in London") != canonical_prompt("Weather in Paris")
+
+
+@pytest.mark.asyncio
+async def test_duplicate_prompts_run_once():
+    runs: list[str] = []
+    stored: dict[int, str] = {}
+
+    async def run(prompt: str) -> str:
+        runs.append(prompt)
+        await asyncio.sleep(0.01)
+        return f"forecast for {prompt}"
+
+    async def store(rows: list[tuple[int, str]]) -> None:
+        stored.update(rows)
+
+    prompts = [("Weather in London tomorrow?", i) for i in range(30)]
+    prompts += [("weather in london tomorrow", 30), ("Weather in Paris", 31)]
+    # arriving after the London run has finished
+    async def feed():
+        for item in prompts:
+            yield item
+        await asyncio.sleep(0.05)
+        yield ("WEATHER IN LONDON TOMORROW", 32)
+
+    stats = await ForecastBatchEngine(run, store, concurrency=4).run(feed())
+
+    assert runs == ["Weather in London tomorrow?", "Weather in Paris"]
+    assert stats.deduplicated == 31
+    assert len(stored) == 33
+    assert stored[32] == stored[0] == "forecast for Weather in London tomorrow?"
+
+
+@pytest.mark.asyncio
+async def test_unexpected_error_aborts_the_batch():
+    stored: list[tuple[int, str]] = []
+
+    async def run(prompt: str) -> str:
+        if prompt == "bug":
+            raise TypeError("not a provider failure")
+        await asyncio.sleep(0.01)
+        return f"forecast for {prompt}"
+
+    async def store(rows: list[tuple[int, str]]) -> None:
+        stored.extend(rows)
+
+    prompts = [("bug", 0)] + [(f"city {i}", i) for i in range(1, 100)]
+    engine = ForecastBatchEngine(run, store, concurrency=2, retry_backoff=0)
+    with pytest.raises(TypeError, match="not a provider failure"):
+        await engine.run(prompts)
+    assert len(stored) < 99
+
+
+@pytest.mark.asyncio
+async def test_failed_writes_are_reported():
+    async def run(prompt: str) -> str:
+        return f"forecast for {prompt}"
+
+    async def store(rows: list[tuple[int, str]]) -> None:
+        raise ConnectionError("database is down")
+
+    engine = ForecastBatchEngine(run, store, max_retries=0)
+    stats = await engine.run([("London", 1), ("Paris", 2)])
+    assert (stats.completed, stats.stored, stats.failed) == (2, 0, 2)
+    assert sorted(stats.failures) == [
+        (1, "ConnectionError('database is down')"),
+        (2, "ConnectionError('database is down')"),
+    ]
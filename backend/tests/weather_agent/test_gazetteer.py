@@ -0,0 +1,34 @@
+from weather_forecast.gazetteer import Gazetteer
+
+
+def test_bundled_gazetteer_lookup():
+    gazetteer = Gazetteer.from_csv()
+
+    london = {"lat": 51.5074, "lng": -0.1278}
+    assert gazetteer.lookup("London") == london
+    assert gazetteer.lookup("london, UK") == london
+    assert gazetteer.lookup("London, England, United Kingdom") == london
+    assert gazetteer.lookup("Miami, FL") == gazetteer.lookup("miami florida usa")
+    assert gazetteer.lookup("Bombay") == gazetteer.lookup("Mumbai")
+    assert gazetteer.lookup("Sao Paulo") == gazetteer.lookup("São Paulo")
+    # not in the gazetteer, so left to the geocoding API
+    assert gazetteer.lookup("London, Ontario") is None
+
+
+def test_prefix_completion(tmp_path):
+    path = tmp_path / "places.csv"
+    path.write_text(
+        "name,region,country,lat,lng,aliases\n"
+        "San Francisco,California|CA,US,37.77,-122.42,SF\n"
+        "San Diego,California|CA,US,32.72,-117.16,\n"
+        "Santiago,Santiago Metropolitan,CL,-33.45,-70.67,\n"
+    )
+    gazetteer = Gazetteer.from_csv(path)
+
+    assert [p.name for p in gazetteer.complete("san")] == [
+        "Santiago",
+        "San Diego",
+        "San Francisco",
+    ]
+    assert [p.name for p in gazetteer.complete("San F", limit=1)] == ["San Francisco"]
+    assert gazetteer.complete("x") == []
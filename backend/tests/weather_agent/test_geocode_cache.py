@@ -0,0 +1,42 @@
+from weather_forecast.geocode_cache import GeocodeCache, normalize_location
+
+
+def test_normalize_location():
+    assert normalize_location("  São Paulo,  BR ") == "sao paulo br"
+    assert normalize_location("LONDON") == normalize_location("london")
+
+
+def test_memory_tier():
+    cache = GeocodeCache(maxsize=2)
+    assert cache.get("London") is None
+
+    cache.set("London", 51.5, -0.1)
+    cache.set("Paris", 48.9, 2.35)
+    assert cache.get("london ") == {"lat": 51.5, "lng": -0.1}
+
+    # Paris is now least recently used and gets evicted
+    cache.set("Berlin", 52.5, 13.4)
+    assert cache.get("Paris") is None
+    assert cache.stats.as_dict() == {"memory_hits": 1, "disk_hits": 0, "misses": 2}
+
+
+def test_disk_tier_shared_between_instances(tmp_path):
+    path = tmp_path / "geocode.sqlite3"
+    writer = GeocodeCache(path)
+    writer.set("Wiltshire", "51.3", "-1.9")
+
+    reader = GeocodeCache(path)
+    assert reader.get("wiltshire") == {"lat": 51.3, "lng": -1.9}
+    assert reader.get("Wiltshire") == {"lat": 51.3, "lng": -1.9}
+    assert reader.stats.disk_hits == 1
+    assert reader.stats.memory_hits == 1
+    writer.close()
+    reader.close()
+
+
+def test_ttl_expiry(tmp_path):
+    cache = GeocodeCache(tmp_path / "geocode.sqlite3", ttl=-1)
+    cache.set("London", 51.5, -0.1)
+    assert cache.get("London") is None
+    assert cache.purge_expired() == 1
+    cache.close()
@@ -0,0 +1,56 @@
+from datetime import date, timedelta
+
+import pytest
+
+from weather_forecast.historic_store import HistoricWeatherStore, ingest
+
+
+@pytest.fixture
+def store(tmp_path) -> HistoricWeatherStore:
+    csv_path = tmp_path / "observations.csv"
+    lines = ["location,date,temperature_mean,temperature_min,temperature_max,precipitation"]
+    for i in range(31):
+        day = date(2024, 3, 1) + timedelta(days=i)
+        lines.append(f"London,{day},{i},{i - 5},{i + 5},1.5")
+    lines.append("Paris,2024-03-10,12,8,16,")
+    csv_path.write_text("\n".join(lines))
+
+    ingest(csv_path, tmp_path / "store")
+    return HistoricWeatherStore.open(tmp_path / "store")
+
+
+def test_day_lookup(store: HistoricWeatherStore):
+    assert store.day("london", date(2024, 3, 2)) == {
+        "temperature_mean": 1.0,
+        "temperature_min": -4.0,
+        "temperature_max": 6.0,
+        "precipitation": 1.5,
+    }
+    assert store.day("Paris", date(2024, 3, 1)) is None
+    assert store.day("Berlin", date(2024, 3, 1)) is None
+    assert store.day("London", date(2023, 1, 1)) is None
+
+
+def test_range_summary(store: HistoricWeatherStore):
+    summary = store.summary("London", date(2024, 3, 1), date(2024, 3, 31))
+    assert summary is not None
+    assert summary.days == 31
+    assert summary.temperature_mean == 15.0
+    assert (summary.temperature_min, summary.temperature_max) == (-5.0, 35.0)
+    assert summary.precipitation_total == pytest.approx(46.5)
+
+    # clipped to the stored days
+    partial = store.summary("Paris", date(2024, 1, 1), date(2024, 12, 31))
+    assert partial is not None and partial.days == 1
+
+
+def test_locations_match_like_geocode_keys(tmp_path):
+    csv_path = tmp_path / "observations.csv"
+    csv_path.write_text(
+        "location,date,temperature_mean,temperature_min,temperature_max,precipitation\n"
+        '"São Paulo, BR",2024-03-01,25,20,30,4\n'
+    )
+    ingest(csv_path, tmp_path / "store")
+    store = HistoricWeatherStore.open(tmp_path / "store")
+    assert store.day("sao paulo br", date(2024, 3, 1)) is not None
+    assert store.day("  SÃO PAULO (BR). ", date(2024, 3, 1)) is not None
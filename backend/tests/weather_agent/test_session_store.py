@@ -0,0 +1,110 @@
+from pydantic_ai.messages import ModelRequest, ModelResponse, TextPart, UserPromptPart
+
+from weather_forecast.session_store import SessionStore
+
+
+def turn(prompt: str) -> list:
+    return [
+        ModelRequest(parts=[UserPromptPart(content=prompt)]),
+        ModelResponse(parts=[TextPart(content=f"answer to {prompt}")]),
+    ]
+
+
+def test_truncate_to_turn():
+    store = SessionStore()
+    # chatbot indexes: each turn is a user message plus one assistant message
+    london = turn("London")
+    assert store.start_turn("s", 0) == []
+    store.finish_turn("s", london)
+    assert len(store.start_turn("s", 2)) == 2
+    store.finish_turn("s", turn("Paris"))
+    store.start_turn("s", 4)
+    store.finish_turn("s", turn("Berlin"))
+    size_before = store.total_bytes
+
+    store.truncate("s", 2)
+    assert store.history("s") == london
+    assert 0 < store.total_bytes < size_before
+
+    # a retried turn starts at the same UI index again
+    assert store.start_turn("s", 2) == london
+
+
+def test_lru_eviction():
+    store = SessionStore(max_sessions=2)
+    turns = {session_id: turn(session_id) for session_id in "abc"}
+    for session_id in ("a", "b"):
+        store.start_turn(session_id, 0)
+        store.finish_turn(session_id, turns[session_id])
+    store.history("a")  # touch a, so b is the least recently used
+    store.start_turn("c", 0)
+    store.finish_turn("c", turns["c"])
+
+    assert len(store) == 2
+    assert store.history("a") == turns["a"]
+    assert store.history("b") == []
+
+
+def test_memory_cap():
+    store = SessionStore()
+    a, b = turn("a"), turn("b")
+    for session_id, messages in (("a", a), ("b", b)):
+        store.start_turn(session_id, 0)
+        store.finish_turn(session_id, messages)
+    # room for two sessions like these, not three
+    store.max_bytes = store.total_bytes * 7 // 5
+
+    store.start_turn("c", 0)
+    store.finish_turn("c", turn("c"))
+    assert store.history("a") == []
+    assert store.history("b") == b
+    assert store.total_bytes <= store.max_bytes
+
+
+def test_session_over_memory_cap_loses_oldest_turns():
+    london, paris, berlin = turn("London"), turn("Paris"), turn("Berlin")
+    store = SessionStore()
+    store.start_turn("s", 0)
+    store.finish_turn("s", london)
+    store.max_bytes = 2 * store.total_bytes + 10
+
+    store.start_turn("s", 2)
+    store.finish_turn("s", paris)
+    store.start_turn("s", 4)
+    store.finish_turn("s", berlin)
+    assert store.history("s") == paris + berlin
+    assert store.total_bytes <= store.max_bytes
+
+    # undoing a turn that was trimmed away clears the rest
+    store.truncate("s", 0)
+    assert store.history("s") == []
+    assert store.total_bytes == 0
+
+
+def test_session_with_turn_in_flight_is_not_evicted():
+    a = turn("a")
+    store = SessionStore(max_sessions=1)
+    store.start_turn("a", 0)
+    store.start_turn("b", 0)
+    store.finish_turn("b", turn("b"))
+    store.start_turn("c", 0)
+    assert len(store) == 2
+    store.finish_turn("a", a)
+    assert store.history("a") == a
+
+    store.start_turn("a", 2)
+    store.cancel_turn("a")
+    store.history("c")  # touch c, so a is evictable again
+    store.start_turn("c", 0)
+    assert len(store) == 1
+    assert store.history("a") == []
+
+
+def test_finish_turn_after_drop_does_not_recreate_session():
+    store = SessionStore()
+    store.start_turn("s", 0)
+    store.drop("s")
+    store.finish_turn("s", turn("late"))
+    assert len(store) == 0
+    assert store.history("s") == []
+    assert store.total_bytes == 0
@@ -0,0 +1,15 @@
+from weather_forecast.ui_streaming import DeltaCoalescer
+
+
+def test_flushes_on_size():
+    coalescer = DeltaCoalescer(interval=60, max_chars=10)
+    assert not coalescer.push("Hello")
+    assert coalescer.push(", world")
+    assert coalescer.flush() == "Hello, world"
+    assert coalescer.flush() == ""
+
+
+def test_zero_interval_flushes_every_delta():
+    coalescer = DeltaCoalescer(interval=0)
+    assert coalescer.push("a")
+    assert coalescer.flush() == "a"
@@ -0,0 +1,44 @@
+import asyncio
+
+import pytest
+
+from weather_forecast.weather_cache import WeatherCache
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_grid_cell_shared_and_concurrent_requests_coalesced():
+    cache = WeatherCache(grid=0.1, bucket=600)
+    calls: list[tuple[float, float]] = []
+
+    async def fetch(lat: float, lng: float) -> dict:
+        calls.append((lat, lng))
+        await asyncio.sleep(0.01)
+        return {"temperature": "12°C"}
+
+    results = await asyncio.gather(
+        *(cache.get_or_fetch(51.501 + i * 0.001, -0.12, fetch) for i in range(10))
+    )
+    assert results == [{"temperature": "12°C"}] * 10
+    assert calls == [(51.5, -0.1)]
+    assert cache.stats.as_dict() == {"hits": 0, "misses": 1, "coalesced": 9}
+
+    assert await cache.get_or_fetch(51.52, -0.13, fetch) == {"temperature": "12°C"}
+    assert cache.stats.hits == 1
+    assert len(calls) == 1
+
+
+async def test_failed_fetch_is_not_cached():
+    cache = WeatherCache()
+    attempts = 0
+
+    async def fetch(lat: float, lng: float) -> str:
+        nonlocal attempts
+        attempts += 1
+        if attempts == 1:
+            raise RuntimeError("upstream down")
+        return "sunny"
+
+    with pytest.raises(RuntimeError):
+        await cache.get_or_fetch(1.0, 2.0, fetch)
+    assert await cache.get_or_fetch(1.0, 2.0, fetch) == "sunny"
@@ -0,0 +1,92 @@
+import asyncio
+
+import httpx
+import pytest
+from pydantic_ai import ModelRetry
+
+from weather_forecast.geocode_cache import GeocodeCache
+from weather_forecast.weather_cache import WeatherCache
+from weather_forecast.weather_lookup import (
+    Deps,
+    build_upstream,
+    lookup_lat_lng,
+    lookup_weather,
+    lookup_weather_batch,
+)
+
+pytestmark = pytest.mark.asyncio
+
+WEATHER = {"data": {"values": {"temperatureApparent": 12.3, "weatherCode": 1000}}}
+
+
+def transport(responses: list[httpx.Response | Exception]) -> httpx.MockTransport:
+    """Answer each request with the next response, raising it if it's an error."""
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    return httpx.MockTransport(handler)
+
+
+def build_deps(client: httpx.AsyncClient, **kwargs) -> Deps:
+    return Deps(client=client, weather_api_key="weather", geo_api_key="geo", **kwargs)
+
+
+@pytest.mark.parametrize("with_upstream", [False, True])
+async def test_geocode_error_serves_stale_entry(with_upstream: bool):
+    # ttl=0: the entry is expired as soon as it's written
+    cache = GeocodeCache(ttl=0)
+    cache.set("London", 51.5, -0.1)
+    upstream = build_upstream("geocode.maps.co", 1.0) if with_upstream else None
+    async with httpx.AsyncClient(transport=transport([httpx.Response(503)])) as client:
+        deps = build_deps(client, geocode_cache=cache, geocode_upstream=upstream)
+        assert await lookup_lat_lng(deps, "London") == {"lat": 51.5, "lng": -0.1}
+
+
+async def test_geocode_error_without_cache_entry_asks_model_to_retry():
+    error = httpx.ConnectError("connection refused")
+    async with httpx.AsyncClient(transport=transport([error])) as client:
+        deps = build_deps(client, geocode_cache=GeocodeCache())
+        with pytest.raises(ModelRetry, match="try again shortly"):
+            await lookup_lat_lng(deps, "London")
+
+
+async def test_weather_error_serves_stale_reading():
+    cache = WeatherCache(bucket=0.01)
+    responses = [httpx.Response(200, json=WEATHER), httpx.Response(503)]
+    async with httpx.AsyncClient(transport=transport(responses)) as client:
+        deps = build_deps(
+            client,
+            weather_cache=cache,
+            weather_upstream=build_upstream("tomorrow.io", 1.0),
+        )
+        fresh = await lookup_weather(deps, 51.5, -0.1)
+        assert fresh == {"temperature": "12°C", "description": "Clear, Sunny"}
+
+        await asyncio.sleep(0.02)  # the reading's time bucket is over
+        assert await lookup_weather(deps, 51.5, -0.1) == {**fresh, "stale": True}
+
+
+async def test_weather_error_without_reading_asks_model_to_retry():
+    async with httpx.AsyncClient(transport=transport([httpx.Response(503)])) as client:
+        deps = build_deps(client, weather_cache=WeatherCache())
+        with pytest.raises(ModelRetry, match="503"):
+            await lookup_weather(deps, 51.5, -0.1)
+
+
+
+async def test_weather_batch_reports_failures_per_location():
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if "48.9" in request.url.params["location"]:
+            return httpx.Response(503)
+        return httpx.Response(200, json=WEATHER)
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        deps = build_deps(client, weather_cache=WeatherCache())
+        locations = [{"lat": 51.5, "lng": -0.1}, {"lat": 48.9, "lng": 2.4}]
+        london, paris = await lookup_weather_batch(deps, locations)
+    assert london == {"temperature": "12°C", "description": "Clear, Sunny"}
+    assert isinstance(paris, str) and "503" in paris
@@ -0,0 +1,275 @@
+from __future__ import annotations as _annotations
+
+import asyncio
+import re
+import time
+import unicodedata
+from collections.abc import AsyncIterable, Awaitable, Callable, Iterable
+from dataclasses import asdict, dataclass, field
+from typing import Any
+
+import httpx
+import logfire
+from pydantic_ai.exceptions import AgentRunError
+
+ForecastRow = tuple[int, str]
+
+# what a failed run or write raises: it's retried, then recorded against its
+# users while the batch goes on; anything else is a bug and aborts the batch
+BATCH_ERRORS: tuple[type[Exception], ...] = (
+    AgentRunError,
+    httpx.HTTPError,
+    ConnectionError,
+    TimeoutError,
+)
+
+_WHITESPACE = re.compile(r"\s+")
+_TRAILING_PUNCTUATION = re.compile(r"[\s?!.]+$")
+
+
+def canonical_prompt(prompt: str) -> str:
+    """Canonical form of a prompt, so trivially different phrasings share a run.
+
+    Only case, unicode form, whitespace and trailing punctuation are ignored;
+    anything that could change the answer is kept.
+    """
+    text = unicodedata.normalize("NFKC", prompt).casefold()
+    text = _WHITESPACE.sub(" ", text).strip()
+    return _TRAILING_PUNCTUATION.sub("", text)
+
+
+@dataclass
+class _PromptGroup:
+    """Users waiting on one agent run for a canonical prompt."""
+
+    user_ids: list[int]
+    done: bool = False
+    forecast: str | None = None
+    error: str | None = None
+
+
+@dataclass
+class BatchStats:
+    submitted: int = 0
+    # prompts answered by another user's identical prompt instead of their own run
+    deduplicated: int = 0
+    completed: int = 0
+    failed: int = 0
+    retries: int = 0
+    stored: int = 0
+    store_batches: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+    # (user_id, error) for prompts whose run or write failed after every retry
+    failures: list[tuple[int, str]] = field(default_factory=list)
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    def as_dict(self) -> dict[str, Any]:
+        stats = asdict(self)
+        del stats["started_at"], stats["failures"]
+        stats["elapsed"] = round(self.elapsed, 3)
+        stats["per_second"] = round(self.completed / self.elapsed, 2)
+        return stats
+
+
+class ForecastBatchEngine:
+    """Run forecast prompts with bounded concurrency and batched writes.
+
+    Prompts are fed through a bounded queue to `concurrency` workers, so a
+    huge backlog is never all in flight at once. Failed runs are retried with
+    exponential backoff. Results are handed to `store` in batches of up to
+    `batch_size` rows, or whatever has accumulated after `flush_interval`
+    seconds.
+
+    With `dedupe`, prompts with the same `canonical_prompt` are run once and
+    the forecast is stored for every user who asked.
+
+    Only `errors` are treated as failures of a single prompt or write; they
+    are listed in the returned stats. Any other exception stops the batch
+    and is raised from `run`.
+    """
+
+    def __init__(
+        self,
+        run: Callable[[str], Awaitable[str]],
+        store: Callable[[list[ForecastRow]], Awaitable[None]],
+        *,
+        concurrency: int = 16,
+        queue_size: int | None = None,
+        batch_size: int = 100,
+        flush_interval: float = 1.0,
+        max_retries: int = 2,
+        retry_backoff: float = 0.5,
+        progress_every: int = 1000,
+        dedupe: bool = True,
+        errors: tuple[type[Exception], ...] = BATCH_ERRORS,
+    ):
+        self._run = run
+        self._store = store
+        self.concurrency = concurrency
+        self.queue_size = queue_size or concurrency * 4
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.progress_every = progress_every
+        self.dedupe = dedupe
+        self.errors = errors
+
+    async def run(
+        self, user_prompts: Iterable[tuple[str, int]] | AsyncIterable[tuple[str, int]]
+    ) -> BatchStats:
+        stats = BatchStats()
+        prompts: asyncio.Queue[tuple[str, _PromptGroup] | None] = asyncio.Queue(
+            self.queue_size
+        )
+        results: asyncio.Queue[ForecastRow | None] = asyncio.Queue(self.batch_size * 2)
+        groups: dict[str, _PromptGroup] = {}
+
+        with logfire.span("forecast batch", concurrency=self.concurrency) as span:
+            writer = asyncio.create_task(self._write(results, stats))
+            workers = [
+                asyncio.create_task(self._work(prompts, results, stats))
+                for _ in range(self.concurrency)
+            ]
+
+            async def feed() -> None:
+                async for prompt, user_id in _aiter(user_prompts):
+                    stats.submitted += 1
+                    key = canonical_prompt(prompt) if self.dedupe else None
+                    group = groups.get(key) if key is not None else None
+                    if group is not None:
+                        stats.deduplicated += 1
+                        group.user_ids.append(user_id)
+                        if group.done:
+                            await self._fan_out(group, [user_id], results, stats)
+                        continue
+
+                    group = _PromptGroup([user_id])
+                    if key is not None:
+                        groups[key] = group
+                    # blocks while the queue is full: prompts are pulled as fast as they run
+                    await prompts.put((prompt, group))
+                for _ in workers:
+                    await prompts.put(None)
+                await asyncio.gather(*workers)
+                await results.put(None)
+
+            feeder = asyncio.create_task(feed())
+            try:
+                # a worker or the writer raising stops the batch at once,
+                # rather than leaving the others waiting on its queue
+                await asyncio.gather(feeder, writer, *workers)
+            finally:
+                for task in (feeder, *workers, writer):
+                    task.cancel()
+            span.set_attribute("stats", stats.as_dict())
+            if stats.failed:
+                logfire.warn(
+                    "{failed} of {submitted} forecasts failed",
+                    failed=stats.failed,
+                    submitted=stats.submitted,
+                    failures=stats.failures[:10],
+                )
+            if stats.deduplicated:
+                logfire.info(
+                    "saved {runs_saved} agent runs by collapsing duplicate prompts",
+                    runs_saved=stats.deduplicated,
+                    distinct_prompts=len(groups),
+                )
+        return stats
+
+    async def _work(
+        self,
+        prompts: asyncio.Queue[tuple[str, _PromptGroup] | None],
+        results: asyncio.Queue[ForecastRow | None],
+        stats: BatchStats,
+    ) -> None:
+        while (item := await prompts.get()) is not None:
+            prompt, group = item
+            try:
+                group.forecast = await self._with_retries(self._run, prompt, stats)
+            except self.errors as e:
+                group.error = repr(e)
+            else:
+                stats.completed += 1
+            # mark done before fanning out: users who join the group from now
+            # on are sent the result by the producer instead
+            group.done = True
+            await self._fan_out(group, list(group.user_ids), results, stats)
+
+    async def _fan_out(
+        self,
+        group: _PromptGroup,
+        user_ids: list[int],
+        results: asyncio.Queue[ForecastRow | None],
+        stats: BatchStats,
+    ) -> None:
+        if group.error is not None:
+            stats.failed += len(user_ids)
+            stats.failures.extend((user_id, group.error) for user_id in user_ids)
+            return
+        assert group.forecast is not None
+        for user_id in user_ids:
+            await results.put((user_id, group.forecast))
+
+    async def _write(
+        self, results: asyncio.Queue[ForecastRow | None], stats: BatchStats
+    ) -> None:
+        batch: list[ForecastRow] = []
+        done = False
+        while not done:
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    row = await asyncio.wait_for(
+                        results.get(), max(deadline - time.monotonic(), 0)
+                    )
+                except TimeoutError:
+                    break
+                if row is None:
+                    done = True
+                    break
+                batch.append(row)
+
+            if batch:
+                await self._flush(batch, stats)
+                batch = []
+
+    async def _flush(self, batch: list[ForecastRow], stats: BatchStats) -> None:
+        try:
+            await self._with_retries(self._store, batch, stats)
+        except self.errors as e:
+            # keep writing later batches; these rows are reported as failures
+            stats.failed += len(batch)
+            stats.failures.extend((user_id, repr(e)) for user_id, _ in batch)
+            return
+
+        before = stats.stored
+        stats.stored += len(batch)
+        stats.store_batches += 1
+        if before // self.progress_every != stats.stored // self.progress_every:
+            logfire.info("forecast batch progress {stats}", stats=stats.as_dict())
+
+    async def _with_retries(
+        self, fn: Callable[[Any], Awaitable[Any]], arg: Any, stats: BatchStats
+    ) -> Any:
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await fn(arg)
+            except self.errors:
+                if attempt == self.max_retries:
+                    raise
+                stats.retries += 1
+                await asyncio.sleep(self.retry_backoff * 2**attempt)
+
+
+async def _aiter(items: Iterable[Any] | AsyncIterable[Any]):
+    if isinstance(items, AsyncIterable):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
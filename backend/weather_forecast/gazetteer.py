@@ -0,0 +1,166 @@
+from __future__ import annotations as _annotations
+
+import csv
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from weather_forecast.geocode_cache import normalize_location
+
+DEFAULT_GAZETTEER = Path(__file__).parent / "data" / "gazetteer.csv"
+
+# ways people refer to the countries in the bundled gazetteer, besides the ISO code
+COUNTRY_NAMES = {
+    "AE": ["uae", "united arab emirates"],
+    "AR": ["argentina"],
+    "AT": ["austria"],
+    "AU": ["australia"],
+    "BD": ["bangladesh"],
+    "BE": ["belgium"],
+    "BG": ["bulgaria"],
+    "BR": ["brazil", "brasil"],
+    "CA": ["canada"],
+    "CH": ["switzerland"],
+    "CL": ["chile"],
+    "CN": ["china"],
+    "CO": ["colombia"],
+    "CU": ["cuba"],
+    "CZ": ["czechia", "czech republic"],
+    "DE": ["germany", "deutschland"],
+    "DK": ["denmark"],
+    "EG": ["egypt"],
+    "ES": ["spain", "espana"],
+    "ET": ["ethiopia"],
+    "FI": ["finland"],
+    "FR": ["france"],
+    "GB": ["uk", "united kingdom", "great britain", "britain"],
+    "GR": ["greece"],
+    "HK": ["china"],
+    "HR": ["croatia"],
+    "HU": ["hungary"],
+    "ID": ["indonesia"],
+    "IE": ["ireland"],
+    "IL": ["israel"],
+    "IN": ["india"],
+    "IR": ["iran"],
+    "IS": ["iceland"],
+    "IT": ["italy", "italia"],
+    "JP": ["japan"],
+    "KE": ["kenya"],
+    "KR": ["south korea", "korea"],
+    "LU": ["luxembourg"],
+    "MA": ["morocco"],
+    "MX": ["mexico"],
+    "MY": ["malaysia"],
+    "NG": ["nigeria"],
+    "NL": ["netherlands", "the netherlands", "holland"],
+    "NO": ["norway"],
+    "NZ": ["new zealand"],
+    "PE": ["peru"],
+    "PH": ["philippines"],
+    "PK": ["pakistan"],
+    "PL": ["poland"],
+    "PT": ["portugal"],
+    "QA": ["qatar"],
+    "RO": ["romania"],
+    "RS": ["serbia"],
+    "RU": ["russia"],
+    "SA": ["saudi arabia"],
+    "SE": ["sweden"],
+    "SG": ["singapore"],
+    "TH": ["thailand"],
+    "TR": ["turkey", "turkiye"],
+    "TW": ["taiwan"],
+    "UA": ["ukraine"],
+    "US": ["us", "usa", "united states", "united states of america", "america"],
+    "VN": ["vietnam"],
+    "ZA": ["south africa"],
+}
+
+
+@dataclass
+class Place:
+    name: str
+    country: str
+    lat: float
+    lng: float
+
+
+@dataclass
+class _TrieNode:
+    children: dict[str, _TrieNode] = field(default_factory=dict)
+    place: Place | None = None
+
+
+class Gazetteer:
+    """In-memory index of well-known places, consulted before the geocoding API.
+
+    Every place is indexed under its name and aliases, alone and combined
+    with its region and country ("miami", "miami fl", "miami florida usa"),
+    all normalized the same way as geocode cache keys. Where two places share
+    a key, the one listed first in the CSV wins.
+    """
+
+    def __init__(self):
+        self._root = _TrieNode()
+        self._index: dict[str, Place] = {}
+
+    @classmethod
+    def from_csv(cls, path: str | Path = DEFAULT_GAZETTEER) -> Gazetteer:
+        gazetteer = cls()
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                place = Place(
+                    name=row["name"],
+                    country=row["country"],
+                    lat=float(row["lat"]),
+                    lng=float(row["lng"]),
+                )
+                names = [row["name"], *filter(None, row["aliases"].split("|"))]
+                regions = list(filter(None, row["region"].split("|")))
+                countries = [row["country"], *COUNTRY_NAMES.get(row["country"], [])]
+                for name in names:
+                    gazetteer.add(name, place)
+                    for suffix in regions + countries:
+                        gazetteer.add(f"{name} {suffix}", place)
+                    for region in regions:
+                        for country in countries:
+                            gazetteer.add(f"{name} {region} {country}", place)
+        return gazetteer
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def add(self, key: str, place: Place) -> None:
+        key = normalize_location(key)
+        if not key or key in self._index:
+            return
+        self._index[key] = place
+        node = self._root
+        for char in key:
+            node = node.children.setdefault(char, _TrieNode())
+        node.place = place
+
+    def lookup(self, location_description: str) -> dict[str, float] | None:
+        place = self._index.get(normalize_location(location_description))
+        if place is None:
+            return None
+        return {"lat": place.lat, "lng": place.lng}
+
+    def complete(self, prefix: str, limit: int = 10) -> list[Place]:
+        """Places with a name or alias starting with `prefix`, shortest keys first."""
+        node = self._root
+        for char in normalize_location(prefix):
+            node = node.children.get(char)  # type: ignore[assignment]
+            if node is None:
+                return []
+
+        found: list[Place] = []
+        level = [node]
+        while level and len(found) < limit:
+            next_level: list[_TrieNode] = []
+            for n in level:
+                if n.place is not None and n.place not in found:
+                    found.append(n.place)
+                next_level.extend(n.children.values())
+            level = next_level
+        return found[:limit]
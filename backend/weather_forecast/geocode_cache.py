@@ -0,0 +1,135 @@
+from __future__ import annotations as _annotations
+
+import re
+import sqlite3
+import time
+import unicodedata
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_location(location: str) -> str:
+    """Normalize a location description into a cache key.
+
+    Case, accents, punctuation and repeated whitespace are ignored, so
+    "  São Paulo, BR " and "sao paulo br" share a key.
+    """
+    text = unicodedata.normalize("NFKD", location)
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = _PUNCTUATION.sub(" ", text.casefold())
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+@dataclass
+class CacheStats:
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+
+    def as_dict(self) -> dict[str, int]:
+        return asdict(self)
+
+
+class GeocodeCache:
+    """Two-tier cache of geocoding results.
+
+    Lookups go to an in-process LRU first, then to an optional SQLite table
+    that is shared between processes. Entries expire after `ttl` seconds.
+    """
+
+    def __init__(
+        self,
+        path: str | Path | None = None,
+        *,
+        maxsize: int = 1024,
+        ttl: float = 30 * 24 * 60 * 60,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stats = CacheStats()
+        # key -> (lat, lng, expires_at)
+        self._memory: OrderedDict[str, tuple[float, float, float]] = OrderedDict()
+        self._db: sqlite3.Connection | None = None
+        if path is not None:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(
+                path, isolation_level=None, check_same_thread=False
+            )
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS geocode ("
+                "key TEXT PRIMARY KEY, lat REAL NOT NULL, lng REAL NOT NULL, "
+                "expires_at REAL NOT NULL)"
+            )
+
+    def get(self, location: str) -> dict[str, float] | None:
+        key = normalize_location(location)
+        now = time.time()
+
+        entry = self._memory.get(key)
+        # expired entries stay around (until evicted) for `get_stale`
+        if entry is not None and entry[2] > now:
+            self._memory.move_to_end(key)
+            self.stats.memory_hits += 1
+            return {"lat": entry[0], "lng": entry[1]}
+
+        if self._db is not None:
+            row = self._db.execute(
+                "SELECT lat, lng, expires_at FROM geocode WHERE key = ? AND expires_at > ?",
+                (key, now),
+            ).fetchone()
+            if row is not None:
+                self._remember(key, row)
+                self.stats.disk_hits += 1
+                return {"lat": row[0], "lng": row[1]}
+
+        self.stats.misses += 1
+        return None
+
+    def set(self, location: str, lat: float, lng: float) -> None:
+        key = normalize_location(location)
+        entry = (float(lat), float(lng), time.time() + self.ttl)
+        self._remember(key, entry)
+        if self._db is not None:
+            self._db.execute(
+                "INSERT OR REPLACE INTO geocode (key, lat, lng, expires_at) VALUES (?, ?, ?, ?)",
+                (key, *entry),
+            )
+
+    def get_stale(self, location: str) -> dict[str, float] | None:
+        """Look up `location` ignoring expiry, as a fallback when the API is down."""
+        key = normalize_location(location)
+        entry = self._memory.get(key)
+        if entry is not None:
+            return {"lat": entry[0], "lng": entry[1]}
+        if self._db is not None:
+            row = self._db.execute(
+                "SELECT lat, lng FROM geocode WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                return {"lat": row[0], "lng": row[1]}
+        return None
+
+    def purge_expired(self) -> int:
+        """Delete expired rows from the on-disk tier, returning how many went."""
+        if self._db is None:
+            return 0
+        cursor = self._db.execute(
+            "DELETE FROM geocode WHERE expires_at <= ?", (time.time(),)
+        )
+        return cursor.rowcount
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def _remember(self, key: str, entry: tuple[float, float, float]) -> None:
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.maxsize:
+            self._memory.popitem(last=False)
@@ -0,0 +1,167 @@
+"""Local columnar store of historical daily weather.
+
+Each measurement is a `(locations, days)` float32 array saved as `.npy` and
+memory-mapped on open, so a lookup touches only the pages it reads and range
+aggregates are single vectorized reductions. Missing days are NaN.
+
+Fill it from a CSV of daily observations, with a `location` and a `date`
+column plus one column per entry in `COLUMNS`:
+
+    python -m weather_forecast.historic_store observations.csv
+
+The store is written to `HISTORIC_STORE_PATH`, or to the directory given
+with `--out`.
+"""
+
+from __future__ import annotations as _annotations
+
+import argparse
+import csv
+import json
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+
+from core.config import settings
+from weather_forecast.geocode_cache import normalize_location
+
+COLUMNS = ("temperature_mean", "temperature_min", "temperature_max", "precipitation")
+
+
+@dataclass
+class HistoricSummary:
+    location: str
+    start: date
+    end: date
+    days: int
+    temperature_mean: float
+    temperature_min: float
+    temperature_max: float
+    precipitation_total: float
+
+    def __str__(self) -> str:
+        return (
+            f"{self.location} from {self.start} to {self.end} ({self.days} days observed): "
+            f"average {self.temperature_mean:.1f}°C, "
+            f"low {self.temperature_min:.1f}°C, high {self.temperature_max:.1f}°C, "
+            f"total precipitation {self.precipitation_total:.1f}mm"
+        )
+
+
+class HistoricWeatherStore:
+    def __init__(self, path: Path, locations: dict[str, int], start_day: int, days: int):
+        self.path = path
+        self.locations = locations
+        self.start_day = start_day
+        self.days = days
+        self.columns = {
+            name: np.load(path / f"{name}.npy", mmap_mode="r") for name in COLUMNS
+        }
+
+    @classmethod
+    def open(cls, path: str | Path) -> HistoricWeatherStore:
+        path = Path(path)
+        meta = json.loads((path / "meta.json").read_text())
+        # stores built with an older key function still match
+        locations: dict[str, int] = {}
+        for location, location_id in meta["locations"].items():
+            locations.setdefault(normalize_location(location), location_id)
+        return cls(path, locations, meta["start_day"], meta["days"])
+
+    @classmethod
+    def open_if_exists(cls, path: str | Path) -> HistoricWeatherStore | None:
+        return cls.open(path) if (Path(path) / "meta.json").exists() else None
+
+    def _index(self, location: str, start: date, end: date) -> tuple[int, slice] | None:
+        location_id = self.locations.get(normalize_location(location))
+        if location_id is None:
+            return None
+        first = max(start.toordinal() - self.start_day, 0)
+        last = min(end.toordinal() - self.start_day, self.days - 1)
+        if first > last:
+            return None
+        return location_id, slice(first, last + 1)
+
+    def day(self, location: str, day: date) -> dict[str, float] | None:
+        index = self._index(location, day, day)
+        if index is None:
+            return None
+        location_id, days = index
+        values = {name: float(column[location_id, days.start]) for name, column in self.columns.items()}
+        if all(np.isnan(v) for v in values.values()):
+            return None
+        return values
+
+    def range(self, location: str, start: date, end: date) -> dict[str, np.ndarray] | None:
+        """Daily values for `location` between `start` and `end` inclusive, by column."""
+        index = self._index(location, start, end)
+        if index is None:
+            return None
+        location_id, days = index
+        return {name: column[location_id, days] for name, column in self.columns.items()}
+
+    def summary(self, location: str, start: date, end: date) -> HistoricSummary | None:
+        values = self.range(location, start, end)
+        if values is None:
+            return None
+        observed = int(np.count_nonzero(~np.isnan(values["temperature_mean"])))
+        if not observed:
+            return None
+        return HistoricSummary(
+            location=location,
+            start=start,
+            end=end,
+            days=observed,
+            temperature_mean=float(np.nanmean(values["temperature_mean"])),
+            temperature_min=float(np.nanmin(values["temperature_min"])),
+            temperature_max=float(np.nanmax(values["temperature_max"])),
+            precipitation_total=float(np.nansum(values["precipitation"])),
+        )
+
+
+def ingest(csv_path: str | Path, out: str | Path) -> HistoricWeatherStore:
+    """Build a store at `out` from a CSV of daily observations, replacing any existing one."""
+    with open(csv_path, newline="") as f:
+        rows = list(csv.DictReader(f))
+
+    locations: dict[str, int] = {}
+    for row in rows:
+        locations.setdefault(normalize_location(row["location"]), len(locations))
+    ordinals = [date.fromisoformat(row["date"]).toordinal() for row in rows]
+    start_day = min(ordinals)
+    days = max(ordinals) - start_day + 1
+
+    out = Path(out)
+    out.mkdir(parents=True, exist_ok=True)
+    location_ids = np.array([locations[normalize_location(row["location"])] for row in rows])
+    day_ids = np.array(ordinals) - start_day
+    for name in COLUMNS:
+        column = np.lib.format.open_memmap(
+            out / f"{name}.npy", mode="w+", dtype=np.float32, shape=(len(locations), days)
+        )
+        column[:] = np.nan
+        values = np.array([float(row[name]) if row.get(name) else np.nan for row in rows])
+        column[location_ids, day_ids] = values
+        column.flush()
+        del column
+
+    (out / "meta.json").write_text(
+        json.dumps({"locations": locations, "start_day": start_day, "days": days})
+    )
+    return HistoricWeatherStore.open(out)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the historic weather store from a CSV.")
+    parser.add_argument("csv_path")
+    parser.add_argument(
+        "--out",
+        default=settings.HISTORIC_STORE_PATH,
+        required=settings.HISTORIC_STORE_PATH is None,
+    )
+    args = parser.parse_args()
+
+    store = ingest(args.csv_path, args.out)
+    print(f"Stored {store.days} days for {len(store.locations)} locations in {store.path}")
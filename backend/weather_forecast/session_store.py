@@ -0,0 +1,147 @@
+from __future__ import annotations as _annotations
+
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from pydantic_ai.messages import ModelMessage, ModelMessagesTypeAdapter
+
+
+@dataclass
+class Session:
+    messages: list[ModelMessage] = field(default_factory=list)
+    # chatbot index of each turn's user message -> offset of its first model
+    # message, in ascending order
+    turn_offsets: dict[int, int] = field(default_factory=dict)
+    # serialized size of each message, to keep the store under its memory cap
+    message_sizes: list[int] = field(default_factory=list)
+    # chatbot index of the turn being run, if any; such sessions aren't evicted
+    pending_turn: int | None = None
+
+    @property
+    def size(self) -> int:
+        return sum(self.message_sizes)
+
+
+class SessionStore:
+    """Server-side message histories for chat UI sessions.
+
+    Sessions are evicted least recently used first once there are more than
+    `max_sessions` or their serialized messages exceed `max_bytes` in total,
+    skipping any with a turn in flight. A session over `max_bytes` on its own
+    loses its oldest turns instead. Each turn's position in the UI is mapped
+    to its offset in the history, so retry and undo cut the history at that
+    offset instead of replaying it.
+    """
+
+    def __init__(self, max_sessions: int = 1000, max_bytes: int = 64 * 1024 * 1024):
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._sessions: OrderedDict[str, Session] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _get(self, session_id: str) -> Session | None:
+        session = self._sessions.get(session_id)
+        if session is not None:
+            self._sessions.move_to_end(session_id)
+        return session
+
+    def history(self, session_id: str) -> list[ModelMessage]:
+        session = self._get(session_id)
+        return list(session.messages) if session is not None else []
+
+    def start_turn(self, session_id: str, ui_index: int) -> list[ModelMessage]:
+        """Record that the turn at `ui_index` starts here, returning the history so far.
+
+        The session can't be evicted until the turn is finished or cancelled.
+        """
+        session = self._get(session_id)
+        if session is None:
+            session = self._sessions[session_id] = Session()
+        session.turn_offsets[ui_index] = len(session.messages)
+        session.pending_turn = ui_index
+        self._evict()
+        return list(session.messages)
+
+    def finish_turn(self, session_id: str, new_messages: list[ModelMessage]) -> None:
+        """Append a turn's messages, unless the session was dropped while it ran."""
+        session = self._get(session_id)
+        if session is None:
+            return
+        sizes = [
+            len(ModelMessagesTypeAdapter.dump_json([message]))
+            for message in new_messages
+        ]
+        session.messages.extend(new_messages)
+        session.message_sizes.extend(sizes)
+        session.pending_turn = None
+        self.total_bytes += sum(sizes)
+        self._trim(session)
+        self._evict()
+
+    def cancel_turn(self, session_id: str) -> None:
+        """Forget a turn that failed or was abandoned before `finish_turn`."""
+        session = self._sessions.get(session_id)
+        if session is None or session.pending_turn is None:
+            return
+        session.turn_offsets.pop(session.pending_turn, None)
+        session.pending_turn = None
+        self._evict()
+
+    def truncate(self, session_id: str, ui_index: int) -> None:
+        """Drop the turn at `ui_index` and everything after it."""
+        session = self._get(session_id)
+        if session is None:
+            return
+        offset = session.turn_offsets.get(ui_index)
+        if offset is None:
+            return
+        while session.turn_offsets:
+            last = next(reversed(session.turn_offsets))
+            if last < ui_index:
+                break
+            del session.turn_offsets[last]
+        self.total_bytes -= sum(session.message_sizes[offset:])
+        del session.messages[offset:]
+        del session.message_sizes[offset:]
+
+    def drop(self, session_id: str) -> None:
+        session = self._sessions.pop(session_id, None)
+        if session is not None:
+            self.total_bytes -= session.size
+
+    def _trim(self, session: Session) -> None:
+        """Drop the session's oldest turns until it fits in `max_bytes` on its own."""
+        size = session.size
+        if size <= self.max_bytes:
+            return
+        # cut at the start of a turn, so tool calls keep their returns
+        for cut in sorted({*session.turn_offsets.values(), len(session.messages)}):
+            if cut and size - sum(session.message_sizes[:cut]) <= self.max_bytes:
+                break
+        self.total_bytes -= sum(session.message_sizes[:cut])
+        del session.messages[:cut]
+        del session.message_sizes[:cut]
+        # retrying or undoing a trimmed turn clears what's left of the history
+        session.turn_offsets = {
+            ui_index: max(offset - cut, 0)
+            for ui_index, offset in session.turn_offsets.items()
+        }
+
+    def _over_limit(self) -> bool:
+        return (
+            len(self._sessions) > self.max_sessions or self.total_bytes > self.max_bytes
+        )
+
+    def _evict(self) -> None:
+        if not self._over_limit():
+            return
+        # the most recently used session is the one being served, and
+        # `_trim` keeps it under the cap on its own
+        for session_id, session in list(self._sessions.items())[:-1]:
+            if session.pending_turn is None:
+                self.drop(session_id)
+                if not self._over_limit():
+                    return
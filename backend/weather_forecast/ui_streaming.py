@@ -0,0 +1,32 @@
+import time
+
+
+class DeltaCoalescer:
+    """Buffer streamed text deltas so the UI is updated in batches.
+
+    `push` returns True once `interval` seconds have passed since the last
+    flush or `max_chars` characters are pending, at which point the caller
+    should `flush` and send one update. An interval of 0 flushes every delta.
+    """
+
+    def __init__(self, interval: float = 0.1, max_chars: int = 400):
+        self.interval = interval
+        self.max_chars = max_chars
+        self._pending: list[str] = []
+        self._pending_chars = 0
+        self._last_flush = time.monotonic()
+
+    def push(self, delta: str) -> bool:
+        self._pending.append(delta)
+        self._pending_chars += len(delta)
+        return (
+            self._pending_chars >= self.max_chars
+            or time.monotonic() - self._last_flush >= self.interval
+        )
+
+    def flush(self) -> str:
+        text = "".join(self._pending)
+        self._pending.clear()
+        self._pending_chars = 0
+        self._last_flush = time.monotonic()
+        return text
@@ -1,14 +1,25 @@
 from __future__ import annotations as _annotations
 
-from dataclasses import dataclass
 from typing import Any
 
 import logfire
 from core.config import settings
+from core.http_clients import http_clients
 from devtools import debug
-from httpx import AsyncClient
-from pydantic_ai import Agent, ModelRetry, RunContext
+from pydantic_ai import Agent, RunContext
 from pydantic_ai.models.openai import OpenAIModel
+from typing_extensions import TypedDict
+from weather_forecast.gazetteer import DEFAULT_GAZETTEER, Gazetteer
+from weather_forecast.geocode_cache import GeocodeCache
+from weather_forecast.weather_cache import WeatherCache
+from weather_forecast.weather_lookup import (
+    Deps,
+    build_upstream,
+    lookup_lat_lng,
+    lookup_lat_lng_batch,
+    lookup_weather,
+    lookup_weather_batch,
+)
 
 # 'if-token-present' means nothing will be sent (and the example will work)
 # if you don't have logfire configured
@@ -23,14 +34,6 @@ model = OpenAIModel(
     base_url=settings.BASE_URL,
 )
 
-
-@dataclass
-class Deps:
-    client: AsyncClient
-    weather_api_key: str | None
-    geo_api_key: str | None
-
-
 weather_agent = Agent(
     model,
     # 'Be concise, reply with one sentence.' is enough for some models (like openai) to use
@@ -38,7 +41,9 @@ weather_agent = Agent(
     system_prompt=(
         "Be concise, reply with one sentence."
         "Use the `get_lat_lng` tool to get the latitude and longitude "
-        "of the locations, then use the `get_weather` tool to get the weather."
+        "of the locations, then use the `get_weather` tool to get the weather. "
+        "When asked about more than one location, use `get_lat_lng_batch` "
+        "and `get_weather_batch` to look them all up in a single call."
     ),
     deps_type=Deps,
     retries=2,
@@ -55,24 +60,7 @@ async def get_lat_lng(
         ctx: The context.
         location_description: A description of a location
     """
-    if ctx.deps.geo_api_key is None:
-        # if no API key is provided, return a dummy response (London)
-        return {"lat": 51.1, "lng": -0.1}
-
-    params = {
-        "q": location_description,
-        "api_key": ctx.deps.geo_api_key,
-    }
-    with logfire.span("calling geocode API", params=params) as span:
-        r = await ctx.deps.client.get("https://geocode.maps.co/search", params=params)
-        r.raise_for_status()
-        data = r.json()
-        span.set_attribute("response", data)
-
-    if data:
-        return {"lat": data[0]["lat"], "lng": data[0]["lon"]}
-    else:
-        raise ModelRetry("Could not find the location")
+    return await lookup_lat_lng(ctx.deps, location_description)
 
 
 @weather_agent.tool
@@ -84,70 +72,78 @@ async def get_weather(ctx: RunContext[Deps], lat: float, lng: float) -> dict[str
     lat: Latitude of the location.
     lng: Longitude of the location.
     """
-    if ctx.deps.weather_api_key is None:
-        # if no API is provided, return a dummy response
-        return {"temperature": "21 °C", "description": "Sunny"}
-
-    params = {
-        "apikey": ctx.deps.weather_api_key,
-        "location": f"{lat}, {lng}",
-        "units": "metric",
-    }
-    with logfire.span("calling weather API", params=params) as span:
-        r = await ctx.deps.client.get(
-            "http://api.tomorrow.io/v4/weather/realtime", params=params
-        )
-        r.raise_for_status()
-        data = r.json()
-        span.set_attribute("response", data)
-
-    values = data["data"]["values"]
-    # https://docs.tomorrow.io/reference/data-layers-weather-codes
-    code_lookup = {
-        1000: "Clear, Sunny",
-        1100: "Mostly Clear",
-        1101: "Partly Cloudy",
-        1102: "Mostly Cloudy",
-        1001: "Cloudy",
-        2000: "Fog",
-        2100: "Light Fog",
-        4000: "Drizzle",
-        4001: "Rain",
-        4200: "Light Rain",
-        4201: "Heavy Rain",
-        5000: "Snow",
-        5001: "Flurries",
-        5100: "Light Snow",
-        5101: "Heavy Snow",
-        6000: "Freezing Drizzle",
-        6001: "Freezing Rain",
-        6200: "Light Freezing Rain",
-        6201: "Heavy Freezing Rain",
-        7000: "Ice Pellets",
-        7101: "Heavy Ice Pellets",
-        7102: "Light Ice Pellets",
-        8000: "Thunderstorm",
-    }
-    return {
-        "temperature": f"{values['temperatureApparent']:0.0f}°C",
-        "description": code_lookup.get(values["weatherCode"], "Unknown"),
-    }
+    return await lookup_weather(ctx.deps, lat, lng)
+
+
+class LatLng(TypedDict):
+    lat: float
+    lng: float
+
+
+@weather_agent.tool
+async def get_lat_lng_batch(
+    ctx: RunContext[Deps], location_descriptions: list[str]
+) -> dict[str, dict[str, float] | str]:
+    """Get the latitude and longitude of several locations in one call.
+
+    Args:
+        ctx: The context.
+        location_descriptions: Descriptions of the locations
+    """
+
+    return await lookup_lat_lng_batch(ctx.deps, location_descriptions)
+
+
+@weather_agent.tool
+async def get_weather_batch(
+    ctx: RunContext[Deps], locations: list[LatLng]
+) -> list[dict[str, Any] | str]:
+    """Get the weather at several locations in one call.
+
+    Locations that couldn't be looked up get an error message instead.
+
+    Args:
+        ctx: The context.
+        locations: Latitude and longitude of each location.
+    """
+    return await lookup_weather_batch(ctx.deps, locations)
 
 
 async def main():
-    async with AsyncClient() as client:
+    async with http_clients.lifespan():
+        client = http_clients.get()
         # create a free API key at https://www.tomorrow.io/weather-api/
         weather_api_key = settings.WEATHER_API_KEY
         # create a free API key at https://geocode.maps.co/
         geo_api_key = settings.GEO_API_KEY
+        geocode_cache = GeocodeCache(
+            settings.GEOCODE_CACHE_PATH,
+            maxsize=settings.GEOCODE_CACHE_SIZE,
+            ttl=settings.GEOCODE_CACHE_TTL,
+        )
         deps = Deps(
             client=client,
             weather_api_key=weather_api_key,
             geo_api_key=geo_api_key,
+            gazetteer=Gazetteer.from_csv(settings.GAZETTEER_PATH or DEFAULT_GAZETTEER),
+            geocode_cache=geocode_cache,
+            weather_cache=WeatherCache(
+                grid=settings.WEATHER_CACHE_GRID,
+                bucket=settings.WEATHER_CACHE_BUCKET,
+            ),
+            geocode_upstream=build_upstream(
+                "geocode.maps.co", settings.GEOCODE_LATENCY_BUDGET
+            ),
+            weather_upstream=build_upstream(
+                "tomorrow.io", settings.WEATHER_LATENCY_BUDGET
+            ),
         )
-        result = await weather_agent.run(
-            "What is the weather like in London and in Wiltshire?", deps=deps
-        )
+        try:
+            result = await weather_agent.run(
+                "What is the weather like in London and in Wiltshire?", deps=deps
+            )
+        finally:
+            geocode_cache.close()
         debug(result)
 
         print("Response:", result.data)
@@ -3,9 +3,24 @@ from __future__ import annotations as _annotations
 import json
 
 from core.config import settings
-from httpx import AsyncClient
-from pydantic_ai.messages import ToolCallPart, ToolReturnPart
-from weather_forecast.weather_agent import Deps, weather_agent
+from core.http_clients import http_clients
+from pydantic_ai import Agent
+from pydantic_ai.messages import (
+    FunctionToolCallEvent,
+    FunctionToolResultEvent,
+    PartDeltaEvent,
+    PartStartEvent,
+    TextPart,
+    TextPartDelta,
+    ToolCallPart,
+    ToolReturnPart,
+)
+from weather_forecast.gazetteer import DEFAULT_GAZETTEER, Gazetteer
+from weather_forecast.geocode_cache import GeocodeCache
+from weather_forecast.session_store import SessionStore
+from weather_forecast.ui_streaming import DeltaCoalescer
+from weather_forecast.weather_agent import Deps, build_upstream, weather_agent
+from weather_forecast.weather_cache import WeatherCache
 
 try:
     import gradio as gr
@@ -17,9 +32,11 @@ except ImportError as e:
 TOOL_TO_DISPLAY_NAME = {
     "get_lat_lng": "Geocoding API",
     "get_weather": "WeatherAPI",
+    "get_lat_lng_batch": "Geocoding API",
+    "get_weather_batch": "WeatherAPI",
 }
 
-client = AsyncClient()
+client = http_clients.get()
 weather_api_key = settings.WEATHER_API_KEY
 # create a free API key at https://geocode.maps.co/
 geo_api_key = settings.GEO_API_KEY
@@ -27,69 +44,124 @@ deps = Deps(
     client=client,
     weather_api_key=weather_api_key,
     geo_api_key=geo_api_key,
+    gazetteer=Gazetteer.from_csv(settings.GAZETTEER_PATH or DEFAULT_GAZETTEER),
+    geocode_cache=GeocodeCache(
+        settings.GEOCODE_CACHE_PATH,
+        maxsize=settings.GEOCODE_CACHE_SIZE,
+        ttl=settings.GEOCODE_CACHE_TTL,
+    ),
+    weather_cache=WeatherCache(
+        grid=settings.WEATHER_CACHE_GRID,
+        bucket=settings.WEATHER_CACHE_BUCKET,
+    ),
+    geocode_upstream=build_upstream("geocode.maps.co", settings.GEOCODE_LATENCY_BUDGET),
+    weather_upstream=build_upstream("tomorrow.io", settings.WEATHER_LATENCY_BUDGET),
+)
+# message histories live here, keyed by gradio's session hash, rather than
+# being round-tripped through the browser on every turn
+sessions = SessionStore(
+    max_sessions=settings.UI_MAX_SESSIONS, max_bytes=settings.UI_SESSION_MAX_BYTES
 )
 
 
-async def stream_from_agent(prompt: str, chatbot: list[dict], past_messages: list):
+async def stream_from_agent(prompt: str, chatbot: list[dict], request: gr.Request):
+    past_messages = sessions.start_turn(request.session_hash, len(chatbot))
     chatbot.append({"role": "user", "content": prompt})
-    yield gr.Textbox(interactive=False, value=""), chatbot, gr.skip()
-    async with weather_agent.run_stream(
-        prompt,
-        deps=deps,
-        message_history=past_messages,
-    ) as result:
-        for message in result.new_messages():
-            for call in message.parts:
-                if isinstance(call, ToolCallPart):
-                    call_args = (
-                        call.args.args_json  # type: ignore
-                        if hasattr(call.args, "args_json")
-                        else json.dumps(call.args.args_dict)  # type: ignore
-                    )
-                    metadata = {
-                        "title": f"🛠️ Using {TOOL_TO_DISPLAY_NAME[call.tool_name]}",
-                    }
-                    if call.tool_call_id is not None:
-                        metadata["id"] = {call.tool_call_id}  # type: ignore
-
-                    gr_message = {
-                        "role": "assistant",
-                        "content": "Parameters: " + call_args,
-                        "metadata": metadata,
-                    }
-                    chatbot.append(gr_message)
-                if isinstance(call, ToolReturnPart):
-                    for gr_message in chatbot:
-                        if (
-                            gr_message.get("metadata", {}).get("id", "")
-                            == call.tool_call_id
-                        ):
-                            gr_message["content"] += (
-                                f"\nOutput: {json.dumps(call.content)}"
-                            )
-                yield gr.skip(), chatbot, gr.skip()
-
-        chatbot.append({"role": "assistant", "content": ""})
-        async for message in result.stream_text():
-            chatbot[-1]["content"] = message
-            yield gr.skip(), chatbot, gr.skip()
-        past_messages = result.all_messages()
-
-        yield gr.Textbox(interactive=True), gr.skip(), past_messages
-
-
-async def handle_retry(chatbot, past_messages: list, retry_data: gr.RetryData):
+    yield gr.Textbox(interactive=False, value=""), chatbot
+
+    # tool call messages still waiting for their output
+    pending_tools: dict[str, dict] = {}
+    try:
+        async with weather_agent.iter(
+            prompt,
+            deps=deps,
+            message_history=past_messages,
+        ) as run:
+            async for node in run:
+                if Agent.is_model_request_node(node):
+                    async with node.stream(run.ctx) as request_stream:
+                        async for update in stream_text(request_stream, chatbot):
+                            yield gr.skip(), update
+                elif Agent.is_call_tools_node(node):
+                    async with node.stream(run.ctx) as tool_events:
+                        async for event in tool_events:
+                            if isinstance(event, FunctionToolCallEvent):
+                                gr_message = tool_call_message(event.part)
+                                pending_tools[event.part.tool_call_id] = gr_message
+                                chatbot.append(gr_message)
+                                yield gr.skip(), chatbot
+                            elif isinstance(event, FunctionToolResultEvent):
+                                gr_message = pending_tools.pop(event.tool_call_id, None)
+                                if gr_message is not None and isinstance(
+                                    event.part, ToolReturnPart
+                                ):
+                                    gr_message["content"] += (
+                                        f"\nOutput: {json.dumps(event.part.content)}"
+                                    )
+                                    yield gr.skip(), chatbot
+
+            assert run.result is not None
+            sessions.finish_turn(request.session_hash, run.result.new_messages())
+    finally:
+        # a failed or abandoned run mustn't pin its session in the store
+        sessions.cancel_turn(request.session_hash)
+
+    yield gr.Textbox(interactive=True), gr.skip()
+
+
+def tool_call_message(call: ToolCallPart) -> dict:
+    tool_name = TOOL_TO_DISPLAY_NAME.get(call.tool_name, call.tool_name)
+    return {
+        "role": "assistant",
+        "content": "Parameters: " + call.args_as_json_str(),
+        "metadata": {"title": f"🛠️ Using {tool_name}", "id": call.tool_call_id},
+    }
+
+
+async def stream_text(request_stream, chatbot: list[dict]):
+    """Append the model's text to the chat as it streams, yielding `chatbot` on each update."""
+    # gradio diffs each update against the last one it sent, so batching
+    # deltas keeps both that work and the websocket traffic down
+    coalescer = DeltaCoalescer(settings.UI_STREAM_INTERVAL, settings.UI_STREAM_MAX_CHARS)
+    gr_message: dict | None = None
+    async for event in request_stream:
+        if isinstance(event, PartStartEvent) and isinstance(event.part, TextPart):
+            delta = event.part.content
+        elif isinstance(event, PartDeltaEvent) and isinstance(
+            event.delta, TextPartDelta
+        ):
+            delta = event.delta.content_delta
+        else:
+            continue
+
+        if gr_message is None:
+            gr_message = {"role": "assistant", "content": ""}
+            chatbot.append(gr_message)
+        if coalescer.push(delta):
+            gr_message["content"] += coalescer.flush()
+            yield chatbot
+
+    if gr_message is not None and (pending := coalescer.flush()):
+        gr_message["content"] += pending
+        yield chatbot
+
+
+async def handle_retry(chatbot, retry_data: gr.RetryData, request: gr.Request):
     new_history = chatbot[: retry_data.index]
     previous_prompt = chatbot[retry_data.index]["content"]
-    past_messages = past_messages[: retry_data.index]
-    async for update in stream_from_agent(previous_prompt, new_history, past_messages):
+    sessions.truncate(request.session_hash, retry_data.index)
+    async for update in stream_from_agent(previous_prompt, new_history, request):
         yield update
 
 
-def undo(chatbot, past_messages: list, undo_data: gr.UndoData):
+def undo(chatbot, undo_data: gr.UndoData, request: gr.Request):
     new_history = chatbot[: undo_data.index]
-    past_messages = past_messages[: undo_data.index]
-    return chatbot[undo_data.index]["content"], new_history, past_messages
+    sessions.truncate(request.session_hash, undo_data.index)
+    return chatbot[undo_data.index]["content"], new_history
+
+
+def end_session(request: gr.Request):
+    sessions.drop(request.session_hash)
 
 
 def select_data(message: gr.SelectData) -> str:
@@ -110,7 +182,6 @@ with gr.Blocks() as demo:
         </div>
     """
     )
-    past_messages = gr.State([])
     chatbot = gr.Chatbot(
         label="Packing Assistant",
         type="messages",
@@ -128,20 +199,23 @@ with gr.Blocks() as demo:
         )
     generation = prompt.submit(
         stream_from_agent,
-        inputs=[prompt, chatbot, past_messages],
-        outputs=[prompt, chatbot, past_messages],
+        inputs=[prompt, chatbot],
+        outputs=[prompt, chatbot],
     )
     chatbot.example_select(select_data, None, [prompt])
     chatbot.retry(
         handle_retry,
-        [chatbot, past_messages],
-        [prompt, chatbot, past_messages],
+        [chatbot],
+        [prompt, chatbot],
     )
     chatbot.undo(
         undo,
-        [chatbot, past_messages],
-        [prompt, chatbot, past_messages],
+        [chatbot],
+        [prompt, chatbot],
     )
+    demo.unload(end_session)
 
 if __name__ == "__main__":
-    demo.launch()
+    # the shared clients are closed by the server's lifespan, in the event
+    # loop that used them
+    demo.launch(app_kwargs={"lifespan": lambda app: http_clients.lifespan()})
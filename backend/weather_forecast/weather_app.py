@@ -1,9 +1,11 @@
-import asyncio
 from datetime import date
 
 from pydantic_ai import Agent, RunContext
 
+from core.config import settings
 from fake_database import DatabaseConn
+from forecast_batch import BatchStats, ForecastBatchEngine
+from historic_store import HistoricWeatherStore
 from weather_service import WeatherService
 
 weather_agent = Agent(
@@ -12,6 +14,23 @@ weather_agent = Agent(
     system_prompt="Providing a weather forecast at the locations the user provides.",
 )
 
+
+_historic_store: HistoricWeatherStore | None = None
+
+
+def historic_store() -> HistoricWeatherStore | None:
+    """The local store of past weather, opened on first use, if it's been built.
+
+    Past weather never changes, so it's served locally where we have it; see
+    historic_store.py for how to build the store. Only a store that opened is
+    kept, so one built while the app is running is picked up on the next call.
+    """
+    global _historic_store
+    if _historic_store is None and settings.HISTORIC_STORE_PATH is not None:
+        _historic_store = HistoricWeatherStore.open_if_exists(settings.HISTORIC_STORE_PATH)
+    return _historic_store
+
+
 @weather_agent.tool
 def weather_forecast(
     ctx: RunContext[WeatherService],
@@ -19,23 +38,66 @@ def weather_forecast(
     forecast_date: date
 ) -> str:
     if forecast_date < date.today():
+        if (store := historic_store()) is not None:
+            observed = store.day(location, forecast_date)
+            if observed is not None:
+                return (
+                    f"Observed: average {observed['temperature_mean']:.1f}°C, "
+                    f"low {observed['temperature_min']:.1f}°C, "
+                    f"high {observed['temperature_max']:.1f}°C, "
+                    f"precipitation {observed['precipitation']:.1f}mm"
+                )
         return ctx.deps.get_historic_weather(location, forecast_date)
     else:
         return ctx.deps.get_forecast(location, forecast_date)
 
 
+@weather_agent.tool_plain
+def historic_weather_summary(location: str, start_date: date, end_date: date) -> str:
+    """Summarize the observed weather at a location over a past date range,
+    e.g. the average temperature in March."""
+    store = historic_store()
+    summary = store.summary(location, start_date, end_date) if store is not None else None
+    if summary is None:
+        return f"No historical weather recorded for {location} in that period."
+    return str(summary)
+
+
 async def run_weather_forecast(
     user_prompts: list[tuple[str, int]],
-    conn: DatabaseConn
-    ):
+    conn: DatabaseConn,
+    *,
+    concurrency: int = 16,
+    batch_size: int = 100,
+    ) -> BatchStats:
     """Run weather forecast for a list of user prompts and save."""
     async with WeatherService() as weather_service:
 
-        async def run_forecast(prompt: str, user_id: int):
+        async def run_forecast(prompt: str) -> str:
             result = await weather_agent.run(prompt, deps=weather_service)
-            await conn.store_forecast(user_id, result.output)
+            return result.output
+
+        # rows of the current batch already written one at a time, so that
+        # retrying a batch after a failed write doesn't store them twice
+        written: set[tuple[int, str]] = set()
+
+        async def store_forecasts(rows: list[tuple[int, str]]):
+            # use a bulk insert where the connection has one
+            store_many = getattr(conn, "store_forecasts", None)
+            if store_many is not None:
+                await store_many(rows)
+                return
+            for row in rows:
+                if row not in written:
+                    await conn.store_forecast(*row)
+                    written.add(row)
+            written.difference_update(rows)
 
-        # run all prompts in parallel
-        await asyncio.gather(
-            *(run_forecast(prompt, user_id) for (prompt, user_id) in user_prompts)
+        # run prompts `concurrency` at a time, writing results in batches
+        engine = ForecastBatchEngine(
+            run_forecast,
+            store_forecasts,
+            concurrency=concurrency,
+            batch_size=batch_size,
         )
+        return await engine.run(user_prompts)
@@ -0,0 +1,98 @@
+from __future__ import annotations as _annotations
+
+import asyncio
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from dataclasses import asdict, dataclass
+from typing import Generic, TypeVar
+
+T = TypeVar("T")
+
+GridCell = tuple[int, int]
+
+
+@dataclass
+class WeatherCacheStats:
+    hits: int = 0
+    misses: int = 0
+    coalesced: int = 0
+
+    def as_dict(self) -> dict[str, int]:
+        return asdict(self)
+
+
+class WeatherCache(Generic[T]):
+    """Cache of weather readings keyed on a lat/lng grid cell and a time bucket.
+
+    Coordinates are snapped to a grid of `grid` degrees, and a reading is
+    reused until the current `bucket`-second window ends. Concurrent misses for
+    the same cell share a single in-flight fetch.
+    """
+
+    def __init__(
+        self, *, grid: float = 0.05, bucket: float = 600, maxsize: int = 4096
+    ):
+        self.grid = grid
+        self.bucket = bucket
+        self.maxsize = maxsize
+        self.stats = WeatherCacheStats()
+        # cell -> (time bucket, value)
+        self._entries: OrderedDict[GridCell, tuple[int, T]] = OrderedDict()
+        self._inflight: dict[tuple[GridCell, int], asyncio.Future[T]] = {}
+
+    def cell(self, lat: float, lng: float) -> GridCell:
+        return round(lat / self.grid), round(lng / self.grid)
+
+    def cell_center(self, cell: GridCell) -> tuple[float, float]:
+        # round again so the coordinates don't carry float noise into API params
+        return round(cell[0] * self.grid, 6), round(cell[1] * self.grid, 6)
+
+    def get_stale(self, lat: float, lng: float) -> T | None:
+        """Return the last reading for the cell, however old, as a fallback."""
+        entry = self._entries.get(self.cell(lat, lng))
+        return entry[1] if entry is not None else None
+
+    async def get_or_fetch(
+        self,
+        lat: float,
+        lng: float,
+        fetch: Callable[[float, float], Awaitable[T]],
+    ) -> T:
+        """Return the cached reading for the cell containing (lat, lng).
+
+        On a miss, `fetch` is called with the cell's center coordinates; any
+        concurrent callers for the same cell await that same call.
+        """
+        cell = self.cell(lat, lng)
+        bucket = int(time.time() // self.bucket)
+
+        entry = self._entries.get(cell)
+        if entry is not None and entry[0] == bucket:
+            self._entries.move_to_end(cell)
+            self.stats.hits += 1
+            return entry[1]
+
+        key = (cell, bucket)
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.stats.coalesced += 1
+            # shield so one cancelled caller doesn't cancel the shared fetch
+            return await asyncio.shield(inflight)
+
+        self.stats.misses += 1
+        task = asyncio.ensure_future(fetch(*self.cell_center(cell)))
+        self._inflight[key] = task
+        task.add_done_callback(lambda t: self._finish(key, t))
+        return await asyncio.shield(task)
+
+    def _finish(self, key: tuple[GridCell, int], task: asyncio.Future[T]) -> None:
+        self._inflight.pop(key, None)
+        if task.cancelled() or task.exception() is not None:
+            return
+        cell, bucket = key
+        self._entries[cell] = (bucket, task.result())
+        self._entries.move_to_end(cell)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
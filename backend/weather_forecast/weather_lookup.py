@@ -0,0 +1,234 @@
+"""Geocoding and weather lookups behind the weather agent's tools.
+
+Kept apart from the agent so the lookups, with their caches and upstream
+fallbacks, can be used and tested without a model.
+"""
+
+from __future__ import annotations as _annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable, Mapping
+from dataclasses import dataclass
+from typing import Any, TypeVar
+
+import httpx
+import logfire
+from httpx import AsyncClient
+from pydantic_ai import ModelRetry
+
+from core.config import settings
+from core.resilience import CircuitBreaker, Upstream, UpstreamUnavailable
+from weather_forecast.gazetteer import Gazetteer
+from weather_forecast.geocode_cache import GeocodeCache
+from weather_forecast.weather_cache import WeatherCache
+
+T = TypeVar("T")
+
+
+@dataclass
+class Deps:
+    client: AsyncClient
+    weather_api_key: str | None
+    geo_api_key: str | None
+    gazetteer: Gazetteer | None = None
+    geocode_cache: GeocodeCache | None = None
+    weather_cache: WeatherCache[dict[str, Any]] | None = None
+    geocode_upstream: Upstream | None = None
+    weather_upstream: Upstream | None = None
+
+
+async def gather_bounded(coros: list[Awaitable[T]], limit: int) -> list[T]:
+    """Like `asyncio.gather`, but with at most `limit` awaitables running at once."""
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(coro: Awaitable[T]) -> T:
+        async with semaphore:
+            return await coro
+
+    return await asyncio.gather(*(run(coro) for coro in coros))
+
+
+async def lookup_lat_lng_batch(
+    deps: Deps, location_descriptions: list[str]
+) -> dict[str, dict[str, float] | str]:
+    """Look up several locations, with an error message for any that fail."""
+
+    async def lookup(location_description: str) -> dict[str, float] | str:
+        try:
+            return await lookup_lat_lng(deps, location_description)
+        except ModelRetry as e:
+            return e.message
+
+    results = await gather_bounded(
+        [lookup(location) for location in location_descriptions],
+        settings.WEATHER_BATCH_CONCURRENCY,
+    )
+    return dict(zip(location_descriptions, results))
+
+
+async def lookup_weather_batch(
+    deps: Deps, locations: list[Mapping[str, float]]
+) -> list[dict[str, Any] | str]:
+    """Look up the weather at several locations, with an error message for any that fail.
+
+    One bad location doesn't cost the others their readings.
+    """
+
+    async def lookup(lat: float, lng: float) -> dict[str, Any] | str:
+        try:
+            return await lookup_weather(deps, lat, lng)
+        except ModelRetry as e:
+            return e.message
+
+    return await gather_bounded(
+        [lookup(loc["lat"], loc["lng"]) for loc in locations],
+        settings.WEATHER_BATCH_CONCURRENCY,
+    )
+
+
+async def lookup_lat_lng(deps: Deps, location_description: str) -> dict[str, float]:
+    # well-known places resolve locally, the API is only for the long tail
+    if deps.gazetteer is not None:
+        known = deps.gazetteer.lookup(location_description)
+        if known is not None:
+            return known
+
+    if deps.geo_api_key is None:
+        # if no API key is provided, return a dummy response (London)
+        return {"lat": 51.1, "lng": -0.1}
+
+    cache = deps.geocode_cache
+    params = {
+        "q": location_description,
+        "api_key": deps.geo_api_key,
+    }
+
+    async def request() -> Any:
+        r = await deps.client.get("https://geocode.maps.co/search", params=params)
+        r.raise_for_status()
+        return r.json()
+
+    with logfire.span("calling geocode API", params=params) as span:
+        cached = cache.get(location_description) if cache is not None else None
+        if cached is None:
+            try:
+                data = await call_upstream(deps.geocode_upstream, request)
+            except (UpstreamUnavailable, httpx.HTTPError) as e:
+                span.set_attribute("upstream_error", str(e))
+                cached = (
+                    cache.get_stale(location_description)
+                    if cache is not None
+                    else None
+                )
+                if cached is None:
+                    raise ModelRetry(f"{e}, try again shortly") from e
+            else:
+                span.set_attribute("response", data)
+                if data and cache is not None:
+                    cache.set(location_description, data[0]["lat"], data[0]["lon"])
+        if cache is not None:
+            span.set_attribute("cache_hit", cached is not None)
+            span.set_attribute("cache_stats", cache.stats.as_dict())
+
+    if cached is not None:
+        return cached
+    elif data:
+        return {"lat": float(data[0]["lat"]), "lng": float(data[0]["lon"])}
+    else:
+        raise ModelRetry(f"Could not find the location {location_description!r}")
+
+
+async def lookup_weather(deps: Deps, lat: float, lng: float) -> dict[str, Any]:
+    if deps.weather_api_key is None:
+        # if no API is provided, return a dummy response
+        return {"temperature": "21 °C", "description": "Sunny"}
+
+    async def fetch(lat: float, lng: float) -> dict[str, Any]:
+        return await call_upstream(
+            deps.weather_upstream, lambda: fetch_realtime_weather(deps, lat, lng)
+        )
+
+    cache = deps.weather_cache
+    try:
+        if cache is None:
+            return await fetch(lat, lng)
+
+        with logfire.span("weather cache lookup", lat=lat, lng=lng) as span:
+            weather = await cache.get_or_fetch(lat, lng, fetch)
+            span.set_attribute("cache_stats", cache.stats.as_dict())
+        return weather
+    except (UpstreamUnavailable, httpx.HTTPError) as e:
+        stale = cache.get_stale(lat, lng) if cache is not None else None
+        if stale is None:
+            raise ModelRetry(f"{e}, try again shortly") from e
+        logfire.warn("serving stale weather: {error}", error=str(e))
+        return {**stale, "stale": True}
+
+
+async def call_upstream(
+    upstream: Upstream | None, request: Callable[[], Awaitable[T]]
+) -> T:
+    if upstream is None:
+        return await request()
+    return await upstream.call(request)
+
+
+def build_upstream(name: str, budget: float) -> Upstream:
+    return Upstream(
+        name,
+        budget=budget,
+        breaker=CircuitBreaker(
+            failure_threshold=settings.UPSTREAM_FAILURE_THRESHOLD,
+            reset_timeout=settings.UPSTREAM_RESET_TIMEOUT,
+        ),
+        hedge_quantile=settings.UPSTREAM_HEDGE_QUANTILE,
+    )
+
+
+# https://docs.tomorrow.io/reference/data-layers-weather-codes
+WEATHER_CODES = {
+    1000: "Clear, Sunny",
+    1100: "Mostly Clear",
+    1101: "Partly Cloudy",
+    1102: "Mostly Cloudy",
+    1001: "Cloudy",
+    2000: "Fog",
+    2100: "Light Fog",
+    4000: "Drizzle",
+    4001: "Rain",
+    4200: "Light Rain",
+    4201: "Heavy Rain",
+    5000: "Snow",
+    5001: "Flurries",
+    5100: "Light Snow",
+    5101: "Heavy Snow",
+    6000: "Freezing Drizzle",
+    6001: "Freezing Rain",
+    6200: "Light Freezing Rain",
+    6201: "Heavy Freezing Rain",
+    7000: "Ice Pellets",
+    7101: "Heavy Ice Pellets",
+    7102: "Light Ice Pellets",
+    8000: "Thunderstorm",
+}
+
+
+async def fetch_realtime_weather(deps: Deps, lat: float, lng: float) -> dict[str, Any]:
+    params = {
+        "apikey": deps.weather_api_key,
+        "location": f"{lat}, {lng}",
+        "units": "metric",
+    }
+    with logfire.span("calling weather API", params=params) as span:
+        r = await deps.client.get(
+            "http://api.tomorrow.io/v4/weather/realtime", params=params
+        )
+        r.raise_for_status()
+        data = r.json()
+        span.set_attribute("response", data)
+
+    values = data["data"]["values"]
+    return {
+        "temperature": f"{values['temperatureApparent']:0.0f}°C",
+        "description": WEATHER_CODES.get(values["weatherCode"], "Unknown"),
+    }